@@ -1,16 +1,17 @@
 import sqlite3
 
-# Connect to the database
-conn = sqlite3.connect('data/navmed_radiation_exam.db')
+# Connect to the database read-only; this script never writes
+conn = sqlite3.connect('file:data/navmed_radiation_exam.db?mode=ro', uri=True)
 cursor = conn.cursor()
 
 # Get all tables
 cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
 tables = cursor.fetchall()
 
+# Build the listing first and write it in one call rather than printing per table
 print(f"Found {len(tables)} tables in the database:")
-for table in tables:
-    print(f"  - {table[0]}")
+if tables:
+    print("\n".join(f"  - {table[0]}" for table in tables))
 
 # Check sample data
 try:
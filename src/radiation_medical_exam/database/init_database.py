@@ -7,12 +7,22 @@ schema, constraints, and sample data following NAVMED requirements.
 
 import sqlite3
 import logging
+from contextlib import closing
 from pathlib import Path
 from typing import Optional, Dict, Any
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
+# Applied once when the database is created. WAL mode is stored in the file itself, so
+# the repository's connections start in it; the others only last for this connection.
+CREATION_PRAGMAS = (
+    "PRAGMA foreign_keys = ON",
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA temp_store = MEMORY",
+)
+
 def initialize_database(db_path: Path, force: bool = False, include_sample_data: bool = True) -> bool:
     """
     Initialize the NAVMED 6470/13 database with proper schema and optional sample data.
@@ -28,10 +38,10 @@ def initialize_database(db_path: Path, force: bool = False, include_sample_data:
     try:
         success = create_database(db_path, force=force, include_sample_data=include_sample_data)
         if success:
-            logger.info(f"Database successfully initialized at {db_path}")
+            logger.info("Database successfully initialized at %s", db_path)
         return success
     except Exception as e:
-        logger.error(f"Failed to initialize database: {e}")
+        logger.error("Failed to initialize database: %s", e)
         return False
 
 def verify_database(db_path: Path) -> Dict[str, Any]:
@@ -48,7 +58,8 @@ def verify_database(db_path: Path) -> Dict[str, Any]:
         if not db_path.exists():
             return {"valid": False, "error": "Database file does not exist"}
         
-        with sqlite3.connect(db_path) as conn:
+        # Verification only reads, so open read-only: no write transaction or journal setup
+        with closing(sqlite3.connect(f"{db_path.resolve().as_uri()}?mode=ro", uri=True)) as conn:
             cursor = conn.cursor()
             
             # Check for expected tables
@@ -111,27 +122,37 @@ def create_database(db_path: Path, force: bool = False, include_sample_data: boo
                 pass
         
         # Create/recreate database
-        with sqlite3.connect(db_path) as conn:
-            conn.execute("PRAGMA foreign_keys = ON")
-            
-            # Drop existing tables if force mode
-            if force:
-                _drop_existing_tables(conn)
-            
-            # Create schema
-            _create_schema(conn)
+        # Autocommit mode leaves transaction control to the explicit statements below
+        with closing(sqlite3.connect(db_path, isolation_level=None)) as conn:
+            for pragma in CREATION_PRAGMAS:
+                conn.execute(pragma)
             
-            # Add sample data if requested
-            if include_sample_data:
-                _add_sample_data(conn)
-            
-            conn.commit()
+            # One transaction, so the drops, schema and sample data cost a single commit;
+            # IMMEDIATE takes the write lock up front so no other writer interleaves
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Drop existing tables if force mode
+                if force:
+                    _drop_existing_tables(conn)
+                
+                # Create schema
+                _create_schema(conn)
+                
+                # Add sample data if requested
+                if include_sample_data:
+                    _add_sample_data(conn)
+                
+                conn.execute("COMMIT")
+            except BaseException:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                raise
             logger.info("Database schema created successfully")
             
         return True
         
     except Exception as e:
-        logger.error(f"Failed to create database: {e}")
+        logger.error("Failed to create database: %s", e)
         return False
 
 def _drop_existing_tables(conn: sqlite3.Connection) -> None:
@@ -201,8 +222,7 @@ def _create_schema(conn: sqlite3.Connection) -> None:
     # Medical History table (blocks 3-10)
     cursor.execute("""
         CREATE TABLE medical_history (
-            history_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            exam_id INTEGER NOT NULL,
+            exam_id INTEGER PRIMARY KEY, -- One row per examination, so exam_id is the row key
             cancer_history TEXT,
             cancer_details TEXT,
             radiation_therapy TEXT,
@@ -227,8 +247,7 @@ def _create_schema(conn: sqlite3.Connection) -> None:
     # Laboratory Findings table (block 11)
     cursor.execute("""
         CREATE TABLE laboratory_findings (
-            lab_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            exam_id INTEGER NOT NULL,
+            exam_id INTEGER PRIMARY KEY, -- One row per examination, so exam_id is the row key
             hematocrit REAL,
             hematocrit_normal_range TEXT,
             wbc_count INTEGER,
@@ -277,8 +296,7 @@ def _create_schema(conn: sqlite3.Connection) -> None:
     # Physical Examination table (blocks 15-19)
     cursor.execute("""
         CREATE TABLE physical_examination (
-            physical_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            exam_id INTEGER NOT NULL,
+            exam_id INTEGER PRIMARY KEY, -- One row per examination, so exam_id is the row key
             thyroid_status TEXT CHECK (thyroid_status IN ('NML', 'ABN', 'NE')),
             thyroid_findings TEXT,
             breast_status TEXT CHECK (breast_status IN ('NML', 'ABN', 'NE')),
@@ -313,8 +331,7 @@ def _create_schema(conn: sqlite3.Connection) -> None:
     # Assessments table (blocks 20a, 20b)
     cursor.execute("""
         CREATE TABLE assessments (
-            assessment_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            exam_id INTEGER NOT NULL,
+            exam_id INTEGER PRIMARY KEY, -- One row per examination, so exam_id is the row key
             initial_assessment TEXT CHECK (initial_assessment IN ('PQ', 'NPQ')),
             assessment_comments TEXT,
             additional_studies_required TEXT,
@@ -331,8 +348,7 @@ def _create_schema(conn: sqlite3.Connection) -> None:
     # Certifications table (blocks 21-23)
     cursor.execute("""
         CREATE TABLE certifications (
-            cert_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            exam_id INTEGER NOT NULL,
+            exam_id INTEGER PRIMARY KEY, -- One row per examination, so exam_id is the row key
             examining_physician TEXT,
             examining_physician_signature TEXT,
             examination_complete_date DATE,
@@ -347,6 +363,9 @@ def _create_schema(conn: sqlite3.Connection) -> None:
         )
     """)
     
+    # Supports date-range searches over examinations
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_exam_date ON examinations (exam_date)")
+    
     logger.info("Database schema created successfully")
 
 def _add_sample_data(conn: sqlite3.Connection) -> None:
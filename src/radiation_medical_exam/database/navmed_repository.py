@@ -6,14 +6,86 @@ separation of concerns and validation.
 """
 
 import sqlite3
+import threading
+from functools import lru_cache
 from datetime import datetime
-from typing import Optional, Any, Dict, List, Union
+from typing import Optional, Any, Dict, FrozenSet, List, Tuple, Union, Iterator
 from pathlib import Path
-from contextlib import closing
+from contextlib import closing, contextmanager
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Applied once to each thread's connection when it is opened
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA mmap_size = 268435456",  # 256 MB memory-mapped I/O
+    "PRAGMA foreign_keys = ON",  # Off by default and set per connection
+)
+
+# Tables holding per-exam sections, in the order complete examinations list them
+RELATED_TABLES = (
+    'medical_history', 'laboratory_findings', 'urine_tests',
+    'additional_studies', 'physical_examination', 'abnormal_findings',
+    'assessments', 'certifications'
+)
+
+# Per-connection compiled statement cache size (sqlite3 defaults to 128)
+CACHED_STATEMENTS = 256
+
+# Examination summary with facility, initial assessment and completion date, by exam or patient
+SUMMARY_SELECT_SQL = (
+    "SELECT e.*, f.facility_name, a.initial_assessment, c.examination_complete_date"
+    " FROM examinations e"
+    " LEFT JOIN examining_facilities f ON e.facility_id = f.facility_id"
+    " LEFT JOIN assessments a ON e.exam_id = a.exam_id"
+    " LEFT JOIN certifications c ON e.exam_id = c.exam_id"
+)
+SUMMARY_BY_EXAM_SQL = SUMMARY_SELECT_SQL + " WHERE e.exam_id = ?"
+SUMMARY_BY_SSN_SQL = SUMMARY_SELECT_SQL + " WHERE e.patient_ssn = ? ORDER BY e.exam_date DESC"
+
+
+@lru_cache(maxsize=256)
+def _insert_sql(table_name: str, columns: tuple) -> str:
+    """Build the INSERT statement for a table and column order, once per shape."""
+    placeholders = ', '.join(['?' for _ in columns])
+    return f"INSERT INTO {table_name} ({', '.join(columns)}) VALUES ({placeholders})"
+
+
+def _bind_record(data: Dict[str, Any], extra: Optional[Dict[str, Any]]) -> tuple:
+    """Return (columns, values) for data plus extra columns, without copying data."""
+    if not extra:
+        return tuple(data), tuple(data.values())
+    if not extra.keys().isdisjoint(data):
+        # Overlapping keys take the extra value, as a dict merge would
+        data = {**data, **extra}
+        return tuple(data), tuple(data.values())
+    return (*data, *extra), (*data.values(), *extra.values())
+
+
+# Comparison operators accepted in range filters
+RANGE_OPERATORS = frozenset(('>=', '<=', '>', '<'))
+
+
+@lru_cache(maxsize=256)
+def _select_sql(table_name: str, filter_columns: tuple, range_conditions: tuple = (),
+                columns: Optional[tuple] = None) -> str:
+    """
+    Build the filtered SELECT statement for a table, once per filter shape and projection.
+    
+    Names are interpolated as given, so callers check them against the table's columns first.
+    """
+    conditions = [f"{column} = ?" for column in filter_columns]
+    conditions += [f"{column} {operator} ?" for column, operator in range_conditions]
+    projection = ', '.join(columns) if columns else '*'
+    query = f"SELECT {projection} FROM {table_name}"
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    # LIMIT is bound as a parameter so the text stays identical across limits
+    return query + " ORDER BY created_at DESC LIMIT ?"
+
 class NavmedRepository:
     """
     Repository for NAVMED 6470/13 database operations.
@@ -35,35 +107,133 @@ class NavmedRepository:
             'physical_examination', 'abnormal_findings', 'assessments',
             'certifications'
         ]
+        # Each thread gets its own long-lived connection, opened on first use
+        self._local = threading.local()
+        # Every open connection, so close() can reach those of other threads; the generation
+        # is bumped on close so threads holding a closed connection open a new one
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        self._generation = 0
+        # Table schemas by table name; cleared when the database is re-initialized
+        self._schema_cache: Dict[str, Dict[str, Any]] = {}
+        # Column names by table name, checked before names are interpolated into queries
+        self._column_names: Dict[str, FrozenSet[str]] = {}
+    
+    def _get_connection(self) -> sqlite3.Connection:
+        """Return the current thread's connection, opening it and applying pragmas on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.generation != self._generation:
+            conn = sqlite3.connect(
+                self.db_path,
+                check_same_thread=False,
+                isolation_level=None,
+                cached_statements=CACHED_STATEMENTS,
+            )
+            conn.row_factory = sqlite3.Row
+            for pragma in CONNECTION_PRAGMAS:
+                conn.execute(pragma)
+            with self._connections_lock:
+                self._connections.append(conn)
+                self._local.generation = self._generation
+            self._local.conn = conn
+        return conn
+    
+    def close(self) -> None:
+        """Close the connections opened by every thread."""
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+            self._generation += 1
+        self._local.conn = None
+        
+        for conn in connections:
+            # SQLite recommends this before closing: it refreshes planner statistics
+            # only for tables this connection's queries showed were stale
+            try:
+                conn.execute("PRAGMA optimize")
+            except sqlite3.Error as e:
+                logger.debug("PRAGMA optimize skipped: %s", e)
+            conn.close()
+    
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        """
+        Run the enclosed queries from this thread as one transaction.
+        
+        Connections run in autocommit mode, so outside a transaction every write
+        commits on its own. The block is committed on exit or rolled back if it
+        raises; nested blocks join the outer transaction.
+        """
+        conn = self._get_connection()
+        if conn.in_transaction:
+            yield
+            return
+        
+        conn.execute("BEGIN")
+        try:
+            yield
+            conn.execute("COMMIT")
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
         
     def execute_query(self, query: str, params: tuple = None) -> Union[List[Dict[str, Any]], Dict[str, Any]]:
         """Execute a SQL query and return results."""
-        logger.debug(f"Executing query: {query}")
+        logger.debug("Executing query: %s", query)
         try:
-            with closing(sqlite3.connect(self.db_path)) as conn:
-                conn.row_factory = sqlite3.Row
-                with closing(conn.cursor()) as cursor:
-                    if params:
-                        cursor.execute(query, params)
-                    else:
-                        cursor.execute(query)
-
-                    if query.strip().upper().startswith(('INSERT', 'UPDATE', 'DELETE')):
-                        conn.commit()
-                        return {"affected_rows": cursor.rowcount, "last_insert_id": cursor.lastrowid}
-
-                    results = [dict(row) for row in cursor.fetchall()]
-                    logger.debug(f"Query returned {len(results)} rows")
-                    return results
+            return self._run_query(self._get_connection(), query, params)
         except Exception as e:
-            logger.error(f"Database error executing query: {e}")
+            logger.error("Database error executing query: %s", e)
             raise
+    
+    def execute_many(self, query: str, rows: List[tuple]) -> Dict[str, Any]:
+        """Execute a write statement once per parameter row and return the affected row count."""
+        logger.debug("Executing query for %s rows: %s", len(rows), query)
+        try:
+            with closing(self._get_connection().cursor()) as cursor:
+                cursor.executemany(query, rows)
+                return {"affected_rows": cursor.rowcount}
+        except Exception as e:
+            logger.error("Database error executing query: %s", e)
+            raise
+    
+    def fetch_tuples(self, query: str, params: tuple = ()) -> List[tuple]:
+        """Execute a read query and return plain row tuples, skipping per-row dict conversion."""
+        logger.debug("Executing query: %s", query)
+        try:
+            with closing(self._get_connection().cursor()) as cursor:
+                # The cursor's own factory overrides the connection's sqlite3.Row
+                cursor.row_factory = None
+                return cursor.execute(query, params).fetchall()
+        except Exception as e:
+            logger.error("Database error executing query: %s", e)
+            raise
+    
+    def _run_query(self, conn: sqlite3.Connection, query: str, params: tuple = None) -> Union[List[Dict[str, Any]], Dict[str, Any]]:
+        """Run a single statement on the given connection and shape its result."""
+        with closing(conn.cursor()) as cursor:
+            if params:
+                cursor.execute(query, params)
+            else:
+                cursor.execute(query)
+
+            if query.strip().upper().startswith(('INSERT', 'UPDATE', 'DELETE')):
+                return {"affected_rows": cursor.rowcount, "last_insert_id": cursor.lastrowid}
+
+            results = [dict(row) for row in cursor.fetchall()]
+            logger.debug("Query returned %s rows", len(results))
+            return results
 
     def get_table_schema(self, table_name: str) -> Dict[str, Any]:
         """Get schema information for a specific table."""
         if table_name not in self.expected_tables:
             raise ValueError(f"Table '{table_name}' is not a valid NAVMED table")
         
+        # Callers add their own keys, so hand out a shallow copy of the cached schema
+        cached = self._schema_cache.get(table_name)
+        if cached is not None:
+            return dict(cached)
+        
         try:
             schema_query = f"PRAGMA table_info({table_name})"
             columns = self.execute_query(schema_query)
@@ -71,7 +241,7 @@ class NavmedRepository:
             fk_query = f"PRAGMA foreign_key_list({table_name})"
             foreign_keys = self.execute_query(fk_query)
             
-            return {
+            schema = {
                 "table_name": table_name,
                 "columns": columns,
                 "foreign_keys": foreign_keys,
@@ -79,15 +249,31 @@ class NavmedRepository:
             }
         except Exception as e:
             raise Exception(f"Error getting schema for {table_name}: {str(e)}")
+        
+        # A missing table has no columns yet; don't pin that until the next re-initialization
+        if columns:
+            self._schema_cache[table_name] = schema
+        return dict(schema)
+    
+    def clear_schema_cache(self) -> None:
+        """Forget cached table schemas, e.g. after the database has been recreated."""
+        self._schema_cache.clear()
+        self._column_names.clear()
+    
+    def _get_column_names(self, table_name: str) -> FrozenSet[str]:
+        """Get the set of a table's column names, read from its schema on first use."""
+        names = self._column_names.get(table_name)
+        if names is None:
+            names = frozenset(col['name'] for col in self.get_table_schema(table_name)['columns'])
+            if names:
+                self._column_names[table_name] = names
+        return names
 
-    def create_record(self, table_name: str, data: Dict[str, Any]) -> Dict[str, Any]:
-        """Create a new record in the specified table."""
+    def create_record(self, table_name: str, data: Dict[str, Any], extra: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Create a new record in the specified table, with optional extra columns such as exam_id."""
         try:
-            columns = list(data.keys())
-            placeholders = ', '.join(['?' for _ in columns])
-            query = f"INSERT INTO {table_name} ({', '.join(columns)}) VALUES ({placeholders})"
-            
-            result = self.execute_query(query, tuple(data.values()))
+            columns, values = _bind_record(data, extra)
+            result = self.execute_query(_insert_sql(table_name, columns), values)
             
             return {
                 "success": True,
@@ -98,26 +284,83 @@ class NavmedRepository:
         except Exception as e:
             return {"success": False, "error": str(e)}
 
-    def get_records(self, table_name: str, filters: Dict[str, Any] = None, limit: int = 10) -> List[Dict[str, Any]]:
-        """Retrieve records from the specified table with optional filtering."""
+    def create_records_bulk(self, table_name: str, records: List[Dict[str, Any]], extra: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Create several records in one table, one executemany per distinct column layout.
+        Columns in extra (e.g. the parent exam_id) are bound to every record.
+        The records are inserted all or nothing, on their own or inside a transaction().
+        """
         try:
-            base_query = f"SELECT * FROM {table_name}"
-            params = []
+            rows_by_columns: Dict[tuple, List[tuple]] = {}
+            for record in records:
+                columns, values = _bind_record(record, extra)
+                rows_by_columns.setdefault(columns, []).append(values)
+            
+            # A failed group undoes the groups before it without touching an outer transaction
+            conn = self._get_connection()
+            conn.execute("SAVEPOINT bulk_insert")
+            try:
+                affected_rows = 0
+                for columns, rows in rows_by_columns.items():
+                    result = self.execute_many(_insert_sql(table_name, columns), rows)
+                    affected_rows += result["affected_rows"]
+            except BaseException:
+                conn.execute("ROLLBACK TO bulk_insert")
+                raise
+            finally:
+                conn.execute("RELEASE bulk_insert")
+            
+            return {"success": True, "affected_rows": affected_rows}
             
-            if filters:
-                conditions = []
-                for column, value in filters.items():
-                    conditions.append(f"{column} = ?")
-                    params.append(value)
-                base_query += " WHERE " + " AND ".join(conditions)
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
+    def get_records(self, table_name: str, filters: Dict[str, Any] = None, limit: int = 10,
+                    range_filters: List[Tuple[str, str, Any]] = None,
+                    columns: List[str] = None) -> List[Dict[str, Any]]:
+        """
+        Retrieve records from the specified table with optional filtering.
+        
+        filters match columns by equality; range_filters are (column, operator, value)
+        triples such as ('exam_date', '>=', '2024-01-01'). columns limits the selected
+        columns when callers only need a few of them.
+        """
+        try:
+            filters = filters or {}
+            range_filters = range_filters or []
+            for _, operator, _ in range_filters:
+                if operator not in RANGE_OPERATORS:
+                    raise ValueError(f"Unsupported range operator: {operator}")
             
-            base_query += f" ORDER BY created_at DESC LIMIT {limit}"
+            # Column names are interpolated into the SQL, so only the table's own columns get through
+            known_columns = self._get_column_names(table_name)
+            requested = (*filters, *(column for column, _, _ in range_filters), *(columns or ()))
+            unknown = [str(column) for column in requested
+                       if not isinstance(column, str) or column not in known_columns]
+            if unknown:
+                raise ValueError(f"Unknown columns: {', '.join(unknown)}")
             
-            return self.execute_query(base_query, tuple(params) if params else None)
+            query = _select_sql(
+                table_name,
+                tuple(filters),
+                tuple((column, operator) for column, operator, _ in range_filters),
+                tuple(columns) if columns else None
+            )
+            params = (*filters.values(), *(value for _, _, value in range_filters), limit)
+            return self.execute_query(query, params)
             
         except Exception as e:
             raise Exception(f"Error retrieving data from {table_name}: {str(e)}")
 
+    def count_by(self, column_expr: str, table_name: str = 'examinations') -> Dict[Any, int]:
+        """
+        Count a table's rows grouped by a column or SQL expression.
+        
+        column_expr is interpolated into the query, so it must come from code, not user input.
+        """
+        query = f"SELECT {column_expr} AS value, COUNT(*) AS count FROM {table_name} GROUP BY value"
+        return dict(self.fetch_tuples(query))
+
     def get_examination_with_relations(self, exam_id: int) -> Dict[str, Any]:
         """Get complete examination with all related records."""
         try:
@@ -131,13 +374,7 @@ class NavmedRepository:
             result = {"examination": examination[0]}
             
             # Get all related records
-            related_tables = [
-                'medical_history', 'laboratory_findings', 'urine_tests',
-                'additional_studies', 'physical_examination', 'abnormal_findings',
-                'assessments', 'certifications'
-            ]
-            
-            for table in related_tables:
+            for table in RELATED_TABLES:
                 query = f"SELECT * FROM {table} WHERE exam_id = ?"
                 records = self.execute_query(query, (exam_id,))
                 result[table] = records
@@ -147,29 +384,46 @@ class NavmedRepository:
         except Exception as e:
             return {"error": f"Error retrieving complete examination: {str(e)}"}
 
+    def get_examinations_with_relations(self, exam_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """
+        Get several complete examinations keyed by exam_id.
+        
+        Issues one query per table for the whole batch instead of one fan-out per exam;
+        ids that don't exist are left out of the result.
+        """
+        if not exam_ids:
+            return {}
+        
+        params = tuple(exam_ids)
+        placeholders = ",".join(["?"] * len(params))
+        
+        examinations = self.execute_query(
+            f"SELECT * FROM examinations WHERE exam_id IN ({placeholders})", params
+        )
+        results = {
+            exam["exam_id"]: {"examination": exam, **{table: [] for table in RELATED_TABLES}}
+            for exam in examinations
+        }
+        
+        for table in RELATED_TABLES:
+            records = self.execute_query(
+                f"SELECT * FROM {table} WHERE exam_id IN ({placeholders})", params
+            )
+            for record in records:
+                complete_exam = results.get(record["exam_id"])
+                if complete_exam is not None:
+                    complete_exam[table].append(record)
+        
+        return results
+
     def get_examination_summary(self, exam_id: int = None, patient_ssn: str = None) -> Dict[str, Any]:
         """Get examination summary with facility and assessment information."""
         try:
             if exam_id:
-                base_query = """
-                    SELECT e.*, f.facility_name, a.initial_assessment, c.examination_complete_date
-                    FROM examinations e
-                    LEFT JOIN examining_facilities f ON e.facility_id = f.facility_id
-                    LEFT JOIN assessments a ON e.exam_id = a.exam_id
-                    LEFT JOIN certifications c ON e.exam_id = c.exam_id
-                    WHERE e.exam_id = ?
-                """
+                base_query = SUMMARY_BY_EXAM_SQL
                 params = (exam_id,)
             elif patient_ssn:
-                base_query = """
-                    SELECT e.*, f.facility_name, a.initial_assessment, c.examination_complete_date
-                    FROM examinations e
-                    LEFT JOIN examining_facilities f ON e.facility_id = f.facility_id
-                    LEFT JOIN assessments a ON e.exam_id = a.exam_id
-                    LEFT JOIN certifications c ON e.exam_id = c.exam_id
-                    WHERE e.patient_ssn = ?
-                    ORDER BY e.exam_date DESC
-                """
+                base_query = SUMMARY_BY_SSN_SQL
                 params = (patient_ssn,)
             else:
                 return {"error": "Must provide either exam_id or patient_ssn"}
@@ -11,6 +11,59 @@ from mcp import types
 
 logger = logging.getLogger(__name__)
 
+# Prompt definitions are static, so the models are built once and shared across calls
+_PROMPTS: List[types.Prompt] = [
+    types.Prompt(
+        name="summarize-notes",
+        description="Creates a summary of all notes",
+        arguments=[
+            types.PromptArgument(
+                name="style",
+                description="Style of the summary (brief/detailed)",
+                required=False,
+            )
+        ],
+    ),
+    types.Prompt(
+        name="explain-procedure",
+        description="Explain a radiation medical exam procedure from the documentation",
+        arguments=[
+            types.PromptArgument(
+                name="procedure",
+                description="Name of the procedure to explain",
+                required=True,
+            )
+        ],
+    ),
+    types.Prompt(
+        name="create-exam-template",
+        description="Create a template for a radiation medical examination",
+        arguments=[
+            types.PromptArgument(
+                name="exam_type",
+                description="Type of examination (PE, RE, SE, TE)",
+                required=True,
+            )
+        ],
+    ),
+    types.Prompt(
+        name="review-examination",
+        description="Review a completed examination for compliance with NAVMED 6470/13",
+        arguments=[
+            types.PromptArgument(
+                name="exam_id",
+                description="Examination ID to review",
+                required=True,
+            ),
+            types.PromptArgument(
+                name="review_type",
+                description="Type of review (medical/administrative/complete)",
+                required=False,
+            )
+        ],
+    )
+]
+
 class PromptHandlers:
     """Handles all MCP prompt operations for the NAVMED server."""
     
@@ -23,57 +76,7 @@ class PromptHandlers:
         List available prompts.
         Each prompt can have optional arguments to customize its behavior.
         """
-        return [
-            types.Prompt(
-                name="summarize-notes",
-                description="Creates a summary of all notes",
-                arguments=[
-                    types.PromptArgument(
-                        name="style",
-                        description="Style of the summary (brief/detailed)",
-                        required=False,
-                    )
-                ],
-            ),
-            types.Prompt(
-                name="explain-procedure",
-                description="Explain a radiation medical exam procedure from the documentation",
-                arguments=[
-                    types.PromptArgument(
-                        name="procedure",
-                        description="Name of the procedure to explain",
-                        required=True,
-                    )
-                ],
-            ),
-            types.Prompt(
-                name="create-exam-template",
-                description="Create a template for a radiation medical examination",
-                arguments=[
-                    types.PromptArgument(
-                        name="exam_type",
-                        description="Type of examination (PE, RE, SE, TE)",
-                        required=True,
-                    )
-                ],
-            ),
-            types.Prompt(
-                name="review-examination",
-                description="Review a completed examination for compliance with NAVMED 6470/13",
-                arguments=[
-                    types.PromptArgument(
-                        name="exam_id",
-                        description="Examination ID to review",
-                        required=True,
-                    ),
-                    types.PromptArgument(
-                        name="review_type",
-                        description="Type of review (medical/administrative/complete)",
-                        required=False,
-                    )
-                ],
-            )
-        ]
+        return _PROMPTS
     
     async def get_prompt(
         self, name: str, arguments: Optional[Dict[str, str]]
@@ -4,14 +4,20 @@ Resource handlers for NAVMED 6470/13 MCP server.
 This module handles all resource operations including notes and PDF documents.
 """
 
-from typing import Dict, List
+from typing import Dict, List, Optional
 import logging
+import os
+import re
+from urllib.parse import unquote
 
 from mcp import types
 from pydantic import AnyUrl
 
 logger = logging.getLogger(__name__)
 
+# pdf://document/{filename} and pdf://chapter/{filename}/{number}
+_PDF_URI_RE = re.compile(r"^pdf://(document|chapter)/([^/]+)(?:/(\d+))?/?$")
+
 class ResourceHandlers:
     """Handles all MCP resource operations for the NAVMED server."""
     
@@ -19,6 +25,16 @@ class ResourceHandlers:
         """Initialize with required dependencies."""
         self.notes = notes
         self.pdf_processor = pdf_processor
+        # Parsed pdf:// URLs keyed by URI string, reset when the instructions directory changes
+        self._pdf_urls: Dict[str, AnyUrl] = {}
+        self._pdf_urls_mtime: Optional[float] = None
+    
+    def _pdf_url(self, uri: str) -> AnyUrl:
+        """Return the parsed AnyUrl for a pdf:// URI, validating each URI only once."""
+        url = self._pdf_urls.get(uri)
+        if url is None:
+            url = self._pdf_urls[uri] = AnyUrl(uri)
+        return url
     
     async def list_resources(self) -> List[types.Resource]:
         """
@@ -38,13 +54,22 @@ class ResourceHandlers:
             for name in self.notes
         ])
         
+        # Drop cached PDF URLs if the instructions directory has changed
+        try:
+            mtime = os.stat(self.pdf_processor.base_path).st_mtime
+        except OSError:
+            mtime = None
+        if mtime != self._pdf_urls_mtime:
+            self._pdf_urls.clear()
+            self._pdf_urls_mtime = mtime
+        
         # Add PDF document resources
         available_pdfs = self.pdf_processor.get_available_pdfs()
         for pdf_file in available_pdfs:
             # Full document
             resources.append(
                 types.Resource(
-                    uri=AnyUrl(f"pdf://document/{pdf_file}"),
+                    uri=self._pdf_url(f"pdf://document/{pdf_file}"),
                     name=f"Document: {pdf_file}",
                     description=f"Complete content of {pdf_file}",
                     mimeType="text/plain",
@@ -55,7 +80,7 @@ class ResourceHandlers:
             if "5055" in pdf_file:  # NAVMED specific document
                 resources.append(
                     types.Resource(
-                        uri=AnyUrl(f"pdf://chapter/{pdf_file}/2"),
+                        uri=self._pdf_url(f"pdf://chapter/{pdf_file}/2"),
                         name=f"Chapter 2: {pdf_file}",
                         description="Chapter 2 - Radiation Medical Exam Instructions and Procedures",
                         mimeType="text/plain",
@@ -78,21 +103,24 @@ class ResourceHandlers:
             raise ValueError(f"Note not found: {name}")
         
         elif uri.scheme == "pdf":
-            path_parts = uri.path.lstrip("/").split("/")
+            # Match the whole URI: "document"/"chapter" parses as the URL host, not part of the path
+            match = _PDF_URI_RE.match(str(uri))
             
-            if len(path_parts) >= 2:
-                resource_type = path_parts[0]  # "document" or "chapter"
-                pdf_filename = path_parts[1]
+            if match:
+                resource_type, pdf_filename, chapter = match.groups()  # resource_type is "document" or "chapter"
+                pdf_filename = unquote(pdf_filename)
+                # The decoded name may hold path separators or "..", so only serve listed PDFs
+                if not self.pdf_processor.has_pdf(pdf_filename):
+                    raise ValueError(f"PDF not found: {pdf_filename}")
                 
                 if resource_type == "document":
                     # Return full document
                     return await self.pdf_processor.extract_text_from_pdf(pdf_filename)
                 
-                elif resource_type == "chapter" and len(path_parts) >= 3:
+                elif chapter is not None:
                     # Return specific chapter
-                    chapter_num = int(path_parts[2])
-                    return await self.pdf_processor.extract_chapter(pdf_filename, chapter_num)
+                    return await self.pdf_processor.extract_chapter(pdf_filename, int(chapter))
             
-            raise ValueError(f"Invalid PDF resource path: {uri.path}")
+            raise ValueError(f"Invalid PDF resource URI: {uri}")
         
         raise ValueError(f"Unsupported URI scheme: {uri.scheme}") 
\ No newline at end of file
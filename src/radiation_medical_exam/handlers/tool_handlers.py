@@ -5,7 +5,10 @@ This module contains all the tool handling logic extracted from the main server
 for better organization and maintainability.
 """
 
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
+from collections import OrderedDict
+import asyncio
+import functools
 import sqlite3
 from pathlib import Path
 import logging
@@ -13,19 +16,33 @@ import logging
 from mcp import types
 from ..services.examination_service import ExaminationService
 from ..database.init_database import initialize_database, verify_database
+from ..database.navmed_repository import RELATED_TABLES
+from ..utils import MAX_NOTES
+from ..utils.formatting import format_record
 
 logger = logging.getLogger(__name__)
 
+def _list_existing_tables(db_path: Path) -> List[str]:
+    """List user tables in the database (blocking)."""
+    with sqlite3.connect(db_path) as conn:
+        cursor = conn.execute("SELECT name FROM sqlite_master WHERE type='table'")
+        return [row[0] for row in cursor.fetchall() if row[0] != 'sqlite_sequence']
+
 class ToolHandlers:
     """Handles all MCP tool operations for the NAVMED server."""
     
-    def __init__(self, db_path: Path, pdf_processor, notes: Dict[str, str]):
+    def __init__(self, db_path: Path, pdf_processor, notes: OrderedDict[str, str]):
         """Initialize with required dependencies."""
-        self.db_path = db_path
+        self.db_path = Path(db_path)
         self.pdf_processor = pdf_processor
         self.notes = notes
         self.examination_service = ExaminationService(db_path)
     
+    async def _run_blocking(self, func, *args, **kwargs):
+        """Run a blocking database call in the default executor so the event loop stays free."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, functools.partial(func, *args, **kwargs))
+    
     async def handle_add_note(self, arguments: Dict[str, Any]) -> List[types.TextContent]:
         """Handle add-note tool."""
         if not arguments:
@@ -38,7 +55,11 @@ class ToolHandlers:
             raise ValueError("Missing name or content")
 
         # Update server state
+        if note_name in self.notes:
+            self.notes.move_to_end(note_name)
         self.notes[note_name] = content
+        if len(self.notes) > MAX_NOTES:
+            self.notes.popitem(last=False)
 
         return [
             types.TextContent(
@@ -57,32 +78,30 @@ class ToolHandlers:
             raise ValueError("Missing search term")
 
         document = arguments.get("document")
+        # Clients may send the limit as a string or below 1; the PDF scan needs a positive int
+        try:
+            max_results = max(1, int(arguments.get("max_results", 50)))
+        except (TypeError, ValueError):
+            raise ValueError("max_results must be an integer")
         results = []
         
         # Search through available PDFs
-        available_pdfs = self.pdf_processor.get_available_pdfs()
-        pdfs_to_search = [document] if document and document in available_pdfs else available_pdfs
+        if document and self.pdf_processor.has_pdf(document):
+            pdfs_to_search = [document]
+        else:
+            pdfs_to_search = self.pdf_processor.get_available_pdfs()
         
-        for pdf_file in pdfs_to_search:
-            try:
-                content = await self.pdf_processor.extract_text_from_pdf(pdf_file)
-                lines = content.split('\n')
-                matching_lines = []
-                
-                for i, line in enumerate(lines):
-                    if search_term.lower() in line.lower():
-                        # Include context (line before and after)
-                        context_start = max(0, i-1)
-                        context_end = min(len(lines), i+2)
-                        context = lines[context_start:context_end]
-                        matching_lines.extend(context)
-                        matching_lines.append("---")
-                
-                if matching_lines:
-                    results.append(f"**Found in {pdf_file}:**\n" + "\n".join(matching_lines))
-            
-            except Exception as e:
-                results.append(f"Error searching {pdf_file}: {str(e)}")
+        # PDFs are searched concurrently; results keep the document order
+        needle = search_term.casefold()
+        outcomes = await asyncio.gather(
+            *(self._search_document(pdf_file, needle, max_results) for pdf_file in pdfs_to_search),
+            return_exceptions=True,
+        )
+        for pdf_file, outcome in zip(pdfs_to_search, outcomes):
+            if isinstance(outcome, Exception):
+                results.append(f"Error searching {pdf_file}: {str(outcome)}")
+            elif outcome:
+                results.append(outcome)
         
         if not results:
             results.append(f"No matches found for '{search_term}' in available documentation.")
@@ -94,45 +113,55 @@ class ToolHandlers:
             )
         ]
     
+    async def _search_document(self, pdf_file: str, needle: str, max_results: int) -> Optional[str]:
+        """Search a single PDF for a casefolded needle and return up to max_results formatted matches, or None."""
+        lines, hits = await self.pdf_processor.find_matching_lines(pdf_file, needle, max_results)
+        # One joined block per hit (the line before and after as context)
+        matches = [
+            "\n".join(lines[max(0, i - 1):i + 2])
+            for i in hits
+        ]
+        
+        if matches:
+            return f"**Found in {pdf_file}:**\n" + "\n---\n".join(matches) + "\n---"
+        return None
+    
     async def handle_initialize_database(self, arguments: Dict[str, Any]) -> List[types.TextContent]:
         """Handle initialize-database tool."""
         force = arguments.get("force", False) if arguments else False
         include_sample_data = arguments.get("include_sample_data", True) if arguments else True
         
         try:
-            db_path = Path(self.db_path)
-            
             # Check if database already exists and has content
-            if db_path.exists() and not force:
+            if self.db_path.exists() and not force:
                 # Check if database has tables
                 try:
-                    with sqlite3.connect(db_path) as conn:
-                        cursor = conn.execute("SELECT name FROM sqlite_master WHERE type='table'")
-                        existing_tables = [row[0] for row in cursor.fetchall()]
-                        navmed_tables = [t for t in existing_tables if t != 'sqlite_sequence']
-                        
-                        if navmed_tables:
-                            return [
-                                types.TextContent(
-                                    type="text",
-                                    text=f"⚠️ Database already exists at {db_path} with {len(navmed_tables)} tables:\n"
-                                         f"📋 Tables: {', '.join(navmed_tables)}\n\n"
-                                         f"🔧 Use force=true to overwrite existing database\n"
-                                         f"✅ Or use the verification tool to check database integrity"
-                                )
-                            ]
+                    navmed_tables = await self._run_blocking(_list_existing_tables, self.db_path)
+                    
+                    if navmed_tables:
+                        return [
+                            types.TextContent(
+                                type="text",
+                                text=f"⚠️ Database already exists at {self.db_path} with {len(navmed_tables)} tables:\n"
+                                     f"📋 Tables: {', '.join(navmed_tables)}\n\n"
+                                     f"🔧 Use force=true to overwrite existing database\n"
+                                     f"✅ Or use the verification tool to check database integrity"
+                            )
+                        ]
                 except Exception:
                     # If we can't read the database, treat it as corrupted and allow recreation
                     pass
             
             # Create the database
-            success = initialize_database(db_path, force=force, include_sample_data=include_sample_data)
+            success = await self._run_blocking(initialize_database, self.db_path, force=force, include_sample_data=include_sample_data)
             
             if success:
+                # Cached schemas and results describe the old database
+                self.examination_service.reset_caches()
                 return [
                     types.TextContent(
                         type="text",
-                        text=f"✅ Database successfully created at {db_path}\n"
+                        text=f"✅ Database successfully created at {self.db_path}\n"
                              f"📊 Force overwrite: {'Yes' if force else 'No'}\n"
                              f"📝 Sample data included: {'Yes' if include_sample_data else 'No'}\n"
                              f"🏥 Ready for NAVMED 6470/13 examination data!"
@@ -142,7 +171,7 @@ class ToolHandlers:
                 return [
                     types.TextContent(
                         type="text",
-                        text=f"❌ Failed to create database at {db_path}.\n"
+                        text=f"❌ Failed to create database at {self.db_path}.\n"
                              f"💡 Check the logs for more details or try with force=true"
                     )
                 ]
@@ -165,28 +194,37 @@ class ToolHandlers:
             raise ValueError("Missing table_name")
 
         try:
-            schema = self.examination_service.get_table_schema(table_name)
+            schema = await self._run_blocking(self.examination_service.get_table_schema, table_name)
+            parts = [
+                f"📊 **Schema for {table_name}**\n\n"
+                f"📋 **Description:** {schema['description']}\n\n"
+                f"🏗️ **Columns ({len(schema['columns'])}):**\n",
+                "\n".join(
+                    f"  • **{col['name']}** ({col['type']}) - "
+                    f"{'NOT NULL' if col['notnull'] else 'NULL'} - "
+                    f"{'PRIMARY KEY' if col['pk'] else ''} - "
+                    f"Default: {col['dflt_value'] or 'None'}"
+                    for col in schema['columns']
+                ),
+            ]
+            
+            if schema['foreign_keys']:
+                parts.append(f"\n\n🔗 **Foreign Keys ({len(schema['foreign_keys'])}):**\n")
+                parts.append("\n".join(
+                    f"  • {fk['from']} → {fk['table']}.{fk['to']}"
+                    for fk in schema['foreign_keys']
+                ))
+            else:
+                parts.append("\n\n🔗 **Foreign Keys:** None")
+            
+            if schema.get('validation_rules'):
+                parts.append("\n\n✅ **Validation Rules:**\n")
+                parts.append("\n".join(f"  • **{k}:** {v}" for k, v in schema['validation_rules'].items()))
+            
             return [
                 types.TextContent(
                     type="text",
-                    text=f"📊 **Schema for {table_name}**\n\n"
-                         f"📋 **Description:** {schema['description']}\n\n"
-                         f"🏗️ **Columns ({len(schema['columns'])}):**\n" + 
-                         "\n".join([
-                             f"  • **{col['name']}** ({col['type']}) - "
-                             f"{'NOT NULL' if col['notnull'] else 'NULL'} - "
-                             f"{'PRIMARY KEY' if col['pk'] else ''} - "
-                             f"Default: {col['dflt_value'] or 'None'}"
-                             for col in schema['columns']
-                         ]) +
-                         (f"\n\n🔗 **Foreign Keys ({len(schema['foreign_keys'])}):**\n" + 
-                          "\n".join([
-                              f"  • {fk['from']} → {fk['table']}.{fk['to']}"
-                              for fk in schema['foreign_keys']
-                          ]) if schema['foreign_keys'] else "\n\n🔗 **Foreign Keys:** None") +
-                         (f"\n\n✅ **Validation Rules:**\n" + 
-                          "\n".join([f"  • **{k}:** {v}" for k, v in schema.get('validation_rules', {}).items()])
-                          if schema.get('validation_rules') else "")
+                    text="".join(parts)
                 )
             ]
         except Exception as e:
@@ -209,7 +247,7 @@ class ToolHandlers:
             raise ValueError("Missing table_name or data")
 
         try:
-            result = self.examination_service.create_examination_record(table_name, data)
+            result = await self._run_blocking(self.examination_service.create_examination_record, table_name, data)
             
             if result["success"]:
                 return [
@@ -253,21 +291,20 @@ class ToolHandlers:
             raise ValueError("Missing table_name")
 
         try:
-            results = self.examination_service.get_examination_records(table_name, filters, limit)
+            results = await self._run_blocking(self.examination_service.get_examination_records, table_name, filters, limit)
             
             if results:
-                result_text = f"📊 **Found {len(results)} records in {table_name}**\n\n"
+                parts = [f"📊 **Found {len(results)} records in {table_name}**\n\n"]
                 
                 for i, record in enumerate(results, 1):
-                    result_text += f"**Record {i}:**\n"
-                    for key, value in record.items():
-                        result_text += f"  • **{key}:** {value}\n"
-                    result_text += "\n"
+                    parts.append(f"**Record {i}:**\n")
+                    parts.append(format_record(record))
+                    parts.append("\n")
                 
                 return [
                     types.TextContent(
                         type="text",
-                        text=result_text
+                        text="".join(parts)
                     )
                 ]
             else:
@@ -296,7 +333,7 @@ class ToolHandlers:
             raise ValueError("Missing exam_id")
 
         try:
-            result = self.examination_service.get_complete_examination(exam_id)
+            result = await self._run_blocking(self.examination_service.get_complete_examination, exam_id)
             
             if "error" in result:
                 return [
@@ -307,32 +344,26 @@ class ToolHandlers:
                 ]
             
             # Format the complete examination data
-            result_text = f"🏥 **Complete Examination - ID: {exam_id}**\n\n"
+            parts = [f"🏥 **Complete Examination - ID: {exam_id}**\n\n"]
             
             # Main examination info
             exam = result["examination"]
-            result_text += f"**📋 Main Examination:**\n"
-            for key, value in exam.items():
-                result_text += f"  • **{key}:** {value}\n"
-            result_text += "\n"
+            parts.append("**📋 Main Examination:**\n")
+            parts.append(format_record(exam))
+            parts.append("\n")
             
             # Related records
-            sections = ["medical_history", "laboratory_findings", "urine_tests", "additional_studies", 
-                       "physical_examination", "abnormal_findings", "assessments", "certifications"]
-            
-            for section in sections:
+            for section in RELATED_TABLES:
                 if section in result and result[section]:
-                    result_text += f"**📝 {section.replace('_', ' ').title()}:**\n"
+                    parts.append(f"**📝 {section.replace('_', ' ').title()}:**\n")
                     for record in result[section]:
-                        for key, value in record.items():
-                            if key != 'exam_id':  # Skip exam_id as it's redundant
-                                result_text += f"  • **{key}:** {value}\n"
-                    result_text += "\n"
+                        parts.append(format_record(record, skip='exam_id'))  # Skip exam_id as it's redundant
+                    parts.append("\n")
             
             return [
                 types.TextContent(
                     type="text",
-                    text=result_text
+                    text="".join(parts)
                 )
             ]
         except Exception as e:
@@ -353,18 +384,27 @@ class ToolHandlers:
             raise ValueError("Missing examination_data")
 
         try:
-            result = self.examination_service.create_complete_examination(examination_data)
+            result = await self._run_blocking(self.examination_service.create_complete_examination, examination_data)
             
             if result["success"]:
+                failed_text = ""
+                if result.get("failed_sections"):
+                    failed_text = "\n\n⚠️ **Sections Not Created:**\n" + "\n".join(
+                        f"  • **{table}:** {'; '.join(errors)}" for table, errors in result["failed_sections"].items()
+                    )
+                
                 return [
                     types.TextContent(
                         type="text",
-                        text=f"✅ **Complete examination created successfully**\n\n"
-                             f"🆔 **Examination ID:** {result['exam_id']}\n"
-                             f"📊 **Records Created:**\n" + 
-                             "\n".join([f"  • **{table}:** {count} record(s)" 
-                                       for table, count in result['created_records'].items()]) +
-                             f"\n\n🏥 **Ready for medical review and certification**"
+                        text="".join([
+                            f"✅ **Complete examination created successfully**\n\n"
+                            f"🆔 **Examination ID:** {result['exam_id']}\n"
+                            f"📊 **Records Created:**\n",
+                            "\n".join(f"  • **{table}:** {count} record(s)"
+                                      for table, count in result['created_records'].items()),
+                            failed_text,
+                            "\n\n🏥 **Ready for medical review and certification**",
+                        ])
                     )
                 ]
             else:
@@ -400,7 +440,7 @@ class ToolHandlers:
             raise ValueError("Must provide either exam_id or patient_ssn")
 
         try:
-            result = self.examination_service.get_examination_summary(exam_id=exam_id, patient_ssn=patient_ssn)
+            result = await self._run_blocking(self.examination_service.get_examination_summary, exam_id=exam_id, patient_ssn=patient_ssn)
             
             if "error" in result:
                 return [
@@ -420,22 +460,24 @@ class ToolHandlers:
                     )
                 ]
             
-            result_text = f"📊 **Examination Summary ({len(examinations)} record(s))**\n\n"
+            parts = [f"📊 **Examination Summary ({len(examinations)} record(s))**\n\n"]
             
             for exam in examinations:
-                result_text += f"**🏥 Examination ID: {exam['exam_id']}**\n"
-                result_text += f"  • **Patient:** {exam.get('patient_name', 'N/A')} (SSN: {exam.get('patient_ssn', 'N/A')})\n"
-                result_text += f"  • **Date:** {exam.get('exam_date', 'N/A')}\n"
-                result_text += f"  • **Type:** {exam.get('exam_type', 'N/A')}\n"
-                result_text += f"  • **Facility:** {exam.get('facility_name', 'N/A')}\n"
-                result_text += f"  • **Assessment:** {exam.get('initial_assessment', 'N/A')}\n"
-                result_text += f"  • **Completed:** {exam.get('examination_complete_date', 'N/A')}\n"
-                result_text += "\n"
+                parts.append(
+                    f"**🏥 Examination ID: {exam['exam_id']}**\n"
+                    f"  • **Patient:** {exam.get('patient_name', 'N/A')} (SSN: {exam.get('patient_ssn', 'N/A')})\n"
+                    f"  • **Date:** {exam.get('exam_date', 'N/A')}\n"
+                    f"  • **Type:** {exam.get('exam_type', 'N/A')}\n"
+                    f"  • **Facility:** {exam.get('facility_name', 'N/A')}\n"
+                    f"  • **Assessment:** {exam.get('initial_assessment', 'N/A')}\n"
+                    f"  • **Completed:** {exam.get('examination_complete_date', 'N/A')}\n"
+                    "\n"
+                )
             
             return [
                 types.TextContent(
                     type="text",
-                    text=result_text
+                    text="".join(parts)
                 )
             ]
         except Exception as e:
@@ -444,4 +486,68 @@ class ToolHandlers:
                     type="text",
                     text=f"❌ Error retrieving examination summary: {str(e)}"
                 )
-            ] 
\ No newline at end of file
+            ] 
+    
+    async def handle_get_patient_exams(self, arguments: Dict[str, Any]) -> List[types.TextContent]:
+        """Handle get-patient-exams tool."""
+        if not arguments:
+            raise ValueError("Missing arguments")
+
+        patient_ssn = arguments.get("patient_ssn")
+        if not patient_ssn:
+            raise ValueError("Missing patient_ssn")
+
+        try:
+            result = await self.examination_service.get_patient_examinations_async(patient_ssn)
+            
+            if "error" in result:
+                return [
+                    types.TextContent(
+                        type="text",
+                        text=f"❌ {result['error']}"
+                    )
+                ]
+            
+            # Summary rows repeat an exam once per joined assessment; list each exam once
+            complete_exams = {
+                entry["complete_data"]["examination"]["exam_id"]: entry["complete_data"]
+                for entry in result["examinations"]
+            }
+            if not complete_exams:
+                return [
+                    types.TextContent(
+                        type="text",
+                        text=f"📭 No examinations found for SSN {patient_ssn}"
+                    )
+                ]
+            
+            parts = [f"👤 **Patient Examinations - SSN: {patient_ssn} ({len(complete_exams)} exam(s))**\n\n"]
+            
+            for exam_id, complete_exam in complete_exams.items():
+                exam = complete_exam["examination"]
+                sections = [
+                    f"{section.replace('_', ' ').title()} ({len(records)})"
+                    for section, records in complete_exam.items()
+                    if section != "examination" and records
+                ]
+                parts.append(
+                    f"**🏥 Examination ID: {exam_id}**\n"
+                    f"  • **Date:** {exam.get('exam_date', 'N/A')}\n"
+                    f"  • **Type:** {exam.get('exam_type', 'N/A')}\n"
+                    f"  • **Sections:** {', '.join(sections) if sections else 'None'}\n"
+                    "\n"
+                )
+            
+            return [
+                types.TextContent(
+                    type="text",
+                    text="".join(parts)
+                )
+            ]
+        except Exception as e:
+            return [
+                types.TextContent(
+                    type="text",
+                    text=f"❌ Error retrieving patient examinations: {str(e)}"
+                )
+            ]
@@ -3,7 +3,7 @@ Services package for business logic and examination operations.
 """
 
 from .examination_service import ExaminationService
-from .validation_service import ValidationService
+from .validation_service import ValidationService, DEFAULT_VALIDATOR
 from .reporting_service import ReportingService
 
-__all__ = ['ExaminationService', 'ValidationService', 'ReportingService'] 
\ No newline at end of file
+__all__ = ['ExaminationService', 'ValidationService', 'DEFAULT_VALIDATOR', 'ReportingService'] 
\ No newline at end of file
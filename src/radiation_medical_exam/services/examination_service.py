@@ -5,15 +5,46 @@ This module provides high-level business logic for managing radiation medical
 examinations, combining repository operations with validation.
 """
 
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Callable, Tuple
+from collections import OrderedDict
+import asyncio
 import logging
+import os
+import threading
+import time
 from pathlib import Path
 
-from ..database.navmed_repository import NavmedRepository
-from .validation_service import ValidationService
+from ..database.navmed_repository import NavmedRepository, RELATED_TABLES
+from .validation_service import DEFAULT_VALIDATOR
 
 logger = logging.getLogger(__name__)
 
+# Read results are reused for this long (seconds) unless a write through the service clears them
+RESULT_CACHE_TTL = 60.0
+RESULT_CACHE_SIZE = 512
+
+def _unique_exam_ids(examinations: List[Dict[str, Any]]) -> List[int]:
+    """Exam ids of summary rows in first-seen order (joined summaries can repeat an exam)."""
+    return list(dict.fromkeys(exam["exam_id"] for exam in examinations if exam.get("exam_id")))
+
+def _patient_examinations(patient_ssn: str, examinations: List[Dict[str, Any]],
+                          complete_exams: Dict[int, Dict[str, Any]]) -> Dict[str, Any]:
+    """Pair each summary row with its complete examination data."""
+    enhanced_examinations = []
+    for exam in examinations:
+        complete_exam = complete_exams.get(exam.get("exam_id"))
+        if complete_exam is not None:
+            enhanced_examinations.append({
+                "summary": exam,
+                "complete_data": complete_exam
+            })
+    
+    return {
+        "patient_ssn": patient_ssn,
+        "examination_count": len(examinations),
+        "examinations": enhanced_examinations
+    }
+
 class ExaminationService:
     """
     Service for managing NAVMED 6470/13 radiation medical examinations.
@@ -25,7 +56,62 @@ class ExaminationService:
     def __init__(self, db_path: Path):
         """Initialize service with repository and validation."""
         self.repository = NavmedRepository(db_path)
-        self.validator = ValidationService()
+        self.validator = DEFAULT_VALIDATOR
+        # (method, args) -> (expiry, db stamp, result), least recently used evicted first
+        self._result_cache: OrderedDict[tuple, Tuple[float, tuple, Dict[str, Any]]] = OrderedDict()
+        self._cache_lock = threading.Lock()
+        # Bumped on every clear so a read that raced a write doesn't store its stale result
+        self._cache_generation = 0
+    
+    def _db_stamp(self) -> tuple:
+        """Modification times of the database file and its WAL, changed by any writer."""
+        stamp = []
+        for path in (self.repository.db_path, self.repository.db_path + "-wal"):
+            try:
+                stamp.append(os.stat(path).st_mtime_ns)
+            except OSError:
+                stamp.append(None)
+        return tuple(stamp)
+    
+    def _cached_read(self, key: tuple, loader: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Return the cached result for key, calling loader when it is missing, expired
+        or the database files were modified since it was stored (e.g. by another process).
+        
+        Cached results are shared by every caller that hits the cache, so they are read-only.
+        """
+        now = time.monotonic()
+        stamp = self._db_stamp()
+        with self._cache_lock:
+            entry = self._result_cache.get(key)
+            if entry is not None and entry[0] > now and entry[1] == stamp:
+                self._result_cache.move_to_end(key)
+                return entry[2]
+            generation = self._cache_generation
+        
+        result = loader()
+        
+        # Errors aren't cached so the next call sees a repaired database, and neither is a
+        # result whose database files changed while it was loading
+        if "error" not in result and self._db_stamp() == stamp:
+            with self._cache_lock:
+                if generation == self._cache_generation:
+                    self._result_cache[key] = (now + RESULT_CACHE_TTL, stamp, result)
+                    self._result_cache.move_to_end(key)
+                    if len(self._result_cache) > RESULT_CACHE_SIZE:
+                        self._result_cache.popitem(last=False)
+        return result
+    
+    def clear_caches(self) -> None:
+        """Drop cached read results, e.g. after a write."""
+        with self._cache_lock:
+            self._result_cache.clear()
+            self._cache_generation += 1
+    
+    def reset_caches(self) -> None:
+        """Drop cached read results and table schemas after the database is re-initialized."""
+        self.clear_caches()
+        self.repository.clear_schema_cache()
     
     def get_table_schema(self, table_name: str) -> Dict[str, Any]:
         """Get table schema with validation rules."""
@@ -35,21 +121,34 @@ class ExaminationService:
             schema['validation_rules'] = validation_rules
             return schema
         except Exception as e:
-            logger.error(f"Error getting schema for {table_name}: {e}")
+            logger.error("Error getting schema for %s: %s", table_name, e)
             raise
     
-    def create_examination_record(self, table_name: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    def create_examination_record(self, table_name: str, data: Dict[str, Any], extra: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
         Create a new examination record with validation.
         
         Args:
             table_name: Name of the table to insert into
             data: Record data to insert
+            extra: Additional columns bound alongside data without copying it (e.g. exam_id)
             
         Returns:
             Dict with operation results
         """
+        result = self._insert_record(table_name, data, extra)
+        if result.get("success"):
+            self.clear_caches()
+        return result
+    
+    def _insert_record(self, table_name: str, data: Dict[str, Any], extra: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Validate and insert one record, leaving the result cache to the caller."""
         try:
+            # exam_id is the rowid of the one-per-exam tables, so SQLite would fill in a missing one
+            # with the next free id and attach the row to whichever exam gets that id
+            if table_name in RELATED_TABLES and data.get('exam_id') is None and (extra or {}).get('exam_id') is None:
+                return {"success": False, "errors": ["Missing required fields: exam_id"]}
+            
             # Validate data first
             validation_result = self.validator.validate_examination_data(table_name, data)
             
@@ -60,31 +159,36 @@ class ExaminationService:
                 }
             
             # Create record in repository
-            result = self.repository.create_record(table_name, data)
+            result = self.repository.create_record(table_name, data, extra)
             
             if result["success"]:
-                logger.info(f"Created record in {table_name} with ID {result['inserted_id']}")
+                logger.info("Created record in %s with ID %s", table_name, result['inserted_id'])
             
             return result
             
         except Exception as e:
-            logger.error(f"Error creating record in {table_name}: {e}")
+            logger.error("Error creating record in %s: %s", table_name, e)
             return {"success": False, "error": str(e)}
     
-    def get_examination_records(self, table_name: str, filters: Dict[str, Any] = None, limit: int = 10) -> List[Dict[str, Any]]:
-        """Get examination records with optional filtering."""
+    def get_examination_records(self, table_name: str, filters: Dict[str, Any] = None, limit: int = 10,
+                                range_filters: List[Tuple[str, str, Any]] = None,
+                                columns: List[str] = None) -> List[Dict[str, Any]]:
+        """Get examination records with optional filtering and column projection."""
         try:
-            return self.repository.get_records(table_name, filters, limit)
+            return self.repository.get_records(table_name, filters, limit, range_filters, columns)
         except Exception as e:
-            logger.error(f"Error retrieving records from {table_name}: {e}")
+            logger.error("Error retrieving records from %s: %s", table_name, e)
             raise
     
     def get_complete_examination(self, exam_id: int) -> Dict[str, Any]:
         """Get complete examination with all related records."""
         try:
-            return self.repository.get_examination_with_relations(exam_id)
+            return self._cached_read(
+                ("complete", exam_id),
+                lambda: self.repository.get_examination_with_relations(exam_id)
+            )
         except Exception as e:
-            logger.error(f"Error retrieving complete examination {exam_id}: {e}")
+            logger.error("Error retrieving complete examination %s: %s", exam_id, e)
             return {"error": str(e)}
     
     def create_complete_examination(self, examination_data: Dict[str, Any]) -> Dict[str, Any]:
@@ -102,49 +206,68 @@ class ExaminationService:
             if 'examination' not in examination_data:
                 return {"success": False, "error": "Missing examination data"}
             
-            # Create main examination record
-            exam_result = self.create_examination_record('examinations', examination_data['examination'])
-            if not exam_result["success"]:
-                return {"success": False, "errors": exam_result.get("errors", [exam_result.get("error")])}
-            
-            exam_id = exam_result["inserted_id"]
-            created_records = {"examinations": 1}
-            
-            # Add related records with the exam_id
-            related_sections = [
-                'medical_history', 'laboratory_findings', 'urine_tests',
-                'additional_studies', 'physical_examination', 'abnormal_findings',
-                'assessments', 'certifications'
-            ]
-            
-            for section in related_sections:
-                if section in examination_data and examination_data[section]:
-                    section_data = examination_data[section].copy()
-                    section_data['exam_id'] = exam_id
-                    
-                    section_result = self.create_examination_record(section, section_data)
-                    if section_result["success"]:
-                        created_records[section] = 1
-                    else:
-                        logger.warning(f"Failed to create {section}: {section_result}")
-            
-            logger.info(f"Created complete examination with ID {exam_id}")
+            # All inserts share one transaction, so the exam costs a single commit
+            with self.repository.transaction():
+                # Create main examination record
+                exam_result = self._insert_record('examinations', examination_data['examination'])
+                if not exam_result["success"]:
+                    return {"success": False, "errors": exam_result.get("errors", [exam_result.get("error")])}
+                
+                exam_id = exam_result["inserted_id"]
+                created_records = {"examinations": 1}
+                failed_sections = {}
+                
+                # Add related records with the exam_id
+                for section in RELATED_TABLES:
+                    if section in examination_data and examination_data[section]:
+                        # A section holds one record, or a list of records for the same table
+                        section_rows = examination_data[section]
+                        if isinstance(section_rows, dict):
+                            section_rows = [section_rows]
+                        
+                        valid_rows = []
+                        for row in section_rows:
+                            # exam_id is bound at insert time, so rows are validated as given
+                            validation_result = self.validator.validate_examination_data(section, row)
+                            if validation_result["valid"]:
+                                valid_rows.append(row)
+                            else:
+                                logger.warning("Failed to create %s: %s", section, validation_result['errors'])
+                                failed_sections.setdefault(section, []).extend(validation_result['errors'])
+                        
+                        if not valid_rows:
+                            continue
+                        
+                        # Every valid row of the section goes in with a single executemany
+                        section_result = self.repository.create_records_bulk(section, valid_rows, {'exam_id': exam_id})
+                        if section_result["success"]:
+                            created_records[section] = section_result["affected_rows"]
+                        else:
+                            logger.warning("Failed to create %s: %s", section, section_result)
+                            failed_sections.setdefault(section, []).append(section_result.get("error", "Insert failed"))
+            
+            self.clear_caches()
+            logger.info("Created complete examination with ID %s", exam_id)
             return {
                 "success": True,
                 "exam_id": exam_id,
-                "created_records": created_records
+                "created_records": created_records,
+                "failed_sections": failed_sections
             }
             
         except Exception as e:
-            logger.error(f"Error creating complete examination: {e}")
+            logger.error("Error creating complete examination: %s", e)
             return {"success": False, "error": str(e)}
     
     def get_examination_summary(self, exam_id: int = None, patient_ssn: str = None) -> Dict[str, Any]:
         """Get examination summary for reporting."""
         try:
-            return self.repository.get_examination_summary(exam_id=exam_id, patient_ssn=patient_ssn)
+            return self._cached_read(
+                ("summary", exam_id, patient_ssn),
+                lambda: self.repository.get_examination_summary(exam_id=exam_id, patient_ssn=patient_ssn)
+            )
         except Exception as e:
-            logger.error(f"Error retrieving examination summary: {e}")
+            logger.error("Error retrieving examination summary: %s", e)
             return {"error": str(e)}
     
     def validate_examination_data(self, table_name: str, data: Dict[str, Any]) -> Dict[str, Any]:
@@ -162,26 +285,44 @@ class ExaminationService:
             
             examinations = summary_result.get("examinations", [])
             
-            # Enhance with complete examination data if requested
-            enhanced_examinations = []
-            for exam in examinations:
-                exam_id = exam.get("exam_id")
-                if exam_id:
-                    complete_exam = self.get_complete_examination(exam_id)
-                    if "error" not in complete_exam:
-                        enhanced_examinations.append({
-                            "summary": exam,
-                            "complete_data": complete_exam
-                        })
+            # Fetch complete data for every exam in one batch rather than per exam
+            exam_ids = _unique_exam_ids(examinations)
+            complete_exams = self.repository.get_examinations_with_relations(exam_ids)
             
-            return {
-                "patient_ssn": patient_ssn,
-                "examination_count": len(examinations),
-                "examinations": enhanced_examinations
+            return _patient_examinations(patient_ssn, examinations, complete_exams)
+            
+        except Exception as e:
+            logger.error("Error retrieving patient examinations for %s: %s", patient_ssn, e)
+            return {"error": str(e)}
+    
+    async def get_patient_examinations_async(self, patient_ssn: str) -> Dict[str, Any]:
+        """
+        Get all examinations for a specific patient, loading each complete examination
+        in its own worker thread so they are read concurrently.
+        """
+        try:
+            summary_result = await asyncio.to_thread(self.get_examination_summary, patient_ssn=patient_ssn)
+            
+            if "error" in summary_result:
+                return summary_result
+            
+            examinations = summary_result.get("examinations", [])
+            
+            # Each read runs on its own connection; WAL lets them proceed in parallel
+            exam_ids = _unique_exam_ids(examinations)
+            results = await asyncio.gather(
+                *(asyncio.to_thread(self.get_complete_examination, exam_id) for exam_id in exam_ids)
+            )
+            complete_exams = {
+                exam_id: complete_exam
+                for exam_id, complete_exam in zip(exam_ids, results)
+                if "error" not in complete_exam
             }
             
+            return _patient_examinations(patient_ssn, examinations, complete_exams)
+            
         except Exception as e:
-            logger.error(f"Error retrieving patient examinations for {patient_ssn}: {e}")
+            logger.error("Error retrieving patient examinations for %s: %s", patient_ssn, e)
             return {"error": str(e)}
     
     def search_examinations(self, search_criteria: Dict[str, Any]) -> List[Dict[str, Any]]:
@@ -207,38 +348,37 @@ class ExaminationService:
             if 'command_unit' in search_criteria:
                 filters['command_unit'] = search_criteria['command_unit']
             
-            if 'date_from' in search_criteria or 'date_to' in search_criteria:
-                # For date range searches, we'll need custom query logic
-                logger.warning("Date range searches not yet implemented")
+            # Date bounds are inclusive and compared as YYYY-MM-DD strings
+            range_filters = []
+            if search_criteria.get('date_from'):
+                range_filters.append(('exam_date', '>=', search_criteria['date_from']))
+            if search_criteria.get('date_to'):
+                range_filters.append(('exam_date', '<=', search_criteria['date_to']))
             
             limit = search_criteria.get('limit', 50)
             
-            return self.get_examination_records('examinations', filters, limit)
+            # Callers that only need a few fields can skip hydrating whole rows
+            columns = search_criteria.get('columns')
+            
+            return self.get_examination_records('examinations', filters, limit, range_filters, columns)
             
         except Exception as e:
-            logger.error(f"Error searching examinations: {e}")
+            logger.error("Error searching examinations: %s", e)
             raise
     
     def get_examination_statistics(self) -> Dict[str, Any]:
         """Get basic statistics about examinations in the database."""
         try:
-            # Get total examination count
-            all_exams = self.get_examination_records('examinations', limit=1000)
-            total_count = len(all_exams)
-            
-            # Count by exam type
-            exam_type_counts = {}
-            for exam in all_exams:
-                exam_type = exam.get('exam_type', 'Unknown')
-                exam_type_counts[exam_type] = exam_type_counts.get(exam_type, 0) + 1
+            # Count by exam type; the groups cover every row, so they also give the total
+            exam_type_counts = self.repository.count_by('exam_type')
+            total_count = sum(exam_type_counts.values())
             
             # Count by year
             year_counts = {}
-            for exam in all_exams:
-                exam_date = exam.get('exam_date', '')
-                if exam_date:
-                    year = exam_date[:4] if len(exam_date) >= 4 else 'Unknown'
-                    year_counts[year] = year_counts.get(year, 0) + 1
+            for year, count in self.repository.count_by('substr(exam_date, 1, 4)').items():
+                if year:
+                    year = year if len(year) >= 4 else 'Unknown'
+                    year_counts[year] = year_counts.get(year, 0) + count
             
             return {
                 "total_examinations": total_count,
@@ -248,5 +388,5 @@ class ExaminationService:
             }
             
         except Exception as e:
-            logger.error(f"Error getting examination statistics: {e}")
+            logger.error("Error getting examination statistics: %s", e)
             return {"error": str(e)}
\ No newline at end of file
@@ -5,22 +5,87 @@ This module handles all validation logic for medical examination data
 following the specific requirements and business rules of NAVMED 6470/13.
 """
 
-from typing import Dict, List, Any
+from collections.abc import Hashable
+from functools import lru_cache
+from typing import Callable, Dict, List, Any, Optional
 import re
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Format patterns, compiled once at import and applied with fullmatch
+_SSN_RE = re.compile(r'\d{3}-\d{2}-\d{4}')
+_DATE_RE = re.compile(r'\d{4}-\d{2}-\d{2}')
+
+def _is_one_of(value: Any, allowed: frozenset) -> bool:
+    """Check set membership; JSON lists and dicts are unhashable, so they are simply not allowed."""
+    return isinstance(value, Hashable) and value in allowed
+
+# Fields checked by the table validators
+_REQUIRED_EXAM_FIELDS = ('exam_type', 'exam_date', 'patient_last_name', 'patient_first_name', 'patient_ssn', 'patient_dob')
+_YES_NO_FIELDS = (
+    'cancer_history', 'radiation_therapy', 'chemotherapy',
+    'radioactive_drugs', 'xray_studies', 'nuclear_medicine',
+    'occupational_exposure'
+)
+_DIFF_FIELDS = ('differential_neutrophils', 'differential_lymphocytes',
+                'differential_monocytes', 'differential_eosinophils', 'differential_basophils')
+_STATUS_FIELDS = ('thyroid_status', 'breast_status', 'testes_status', 'dre_status', 'skin_status')
+_ASSESSMENT_FIELDS = ('initial_assessment', 'reab_final_determination')
+_DATE_FIELDS = ('examination_complete_date', 'review_date', 'patient_signature_date')
+
 class ValidationService:
     """Service for validating NAVMED 6470/13 examination data."""
     
+    # Allowed values; tuples keep the order used in messages
+    EXAM_TYPES = ('PE', 'RE', 'SE', 'TE')
+    STATUS_VALUES = ('NML', 'ABN', 'NE')
+    ASSESSMENT_VALUES = ('PQ', 'NPQ')
+    FINDING_CATEGORIES = ('CD', 'NCD')
+    URINE_RESULTS = ('Negative', 'Positive', 'Not Performed')
+    
+    # Sets for membership checks and joined strings for error messages
+    _EXAM_TYPES_SET = frozenset(EXAM_TYPES)
+    _STATUS_SET = frozenset(STATUS_VALUES)
+    _ASSESSMENT_SET = frozenset(ASSESSMENT_VALUES)
+    _FINDING_SET = frozenset(FINDING_CATEGORIES)
+    _URINE_SET = frozenset(URINE_RESULTS)
+    _YES_NO = frozenset(('Yes', 'No'))
+    _EXAM_TYPES_STR = ', '.join(EXAM_TYPES)
+    _STATUS_STR = ', '.join(STATUS_VALUES)
+    _ASSESSMENT_STR = ', '.join(ASSESSMENT_VALUES)
+    _FINDING_STR = ', '.join(FINDING_CATEGORIES)
+    _URINE_STR = ', '.join(URINE_RESULTS)
+    
+    # Complete error messages, or suffixes appended to the field name
+    _EXAM_TYPE_ERR = f"exam_type must be one of: {_EXAM_TYPES_STR} (PE=Physical, RE=Re-examination, SE=Special, TE=Termination)"
+    _URINE_ERR = f"dipstick_blood_result must be one of: {_URINE_STR}"
+    _FINDING_ERR = f"finding_category must be one of: {_FINDING_STR} (CD=Considered Disqualifying, NCD=Not Considered Disqualifying)"
+    _STATUS_ERR_SUFFIX = f" must be one of: {_STATUS_STR} (NML=Normal, ABN=Abnormal, NE=Not Examined)"
+    _ASSESSMENT_ERR_SUFFIX = f" must be one of: {_ASSESSMENT_STR} (PQ=Physically Qualified, NPQ=Not Physically Qualified)"
+    
+    # Tables whose validators report missing fields, so an empty record is not trivially valid
+    _REQUIRED_FIELD_TABLES = frozenset(('examinations',))
+    
     def __init__(self):
         """Initialize validation service with rules."""
-        self.exam_types = ['PE', 'RE', 'SE', 'TE']
-        self.status_values = ['NML', 'ABN', 'NE']
-        self.assessment_values = ['PQ', 'NPQ']
-        self.finding_categories = ['CD', 'NCD']
-        self.urine_results = ['Negative', 'Positive', 'Not Performed']
+        # Table-specific checks; tables without an entry only get the common checks
+        self._dispatch: Dict[str, Callable[[Dict[str, Any]], List[str]]] = {
+            'examinations': self._validate_examination_record,
+            'medical_history': self._validate_medical_history,
+            'laboratory_findings': self._validate_laboratory_findings,
+            'urine_tests': self._validate_urine_tests,
+            'physical_examination': self._validate_physical_examination,
+            'abnormal_findings': self._validate_abnormal_findings,
+            'assessments': self._validate_assessments,
+            'certifications': self._validate_certifications,
+        }
+        # Validator closures for the known tables, plus one shared common-field validator for
+        # any other name, so the cache can't grow with caller-supplied table names
+        self._compiled: Dict[str, Callable[[Dict[str, Any]], List[str]]] = {
+            table: self._compile_validator(table) for table in self._dispatch
+        }
+        self._common_validator = self._compile_validator(None)
     
     def validate_examination_data(self, table_name: str, data: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -33,55 +98,57 @@ class ValidationService:
         Returns:
             Dict with validation results
         """
-        errors = []
+        # An empty record has nothing to check unless the table has required fields
+        if not data and isinstance(data, dict) and table_name not in self._REQUIRED_FIELD_TABLES:
+            return {"valid": True, "errors": []}
+        
+        validator = self._compiled.get(table_name, self._common_validator)
         
         try:
-            # Table-specific validation
-            if table_name == 'examinations':
-                errors.extend(self._validate_examination_record(data))
-            elif table_name == 'medical_history':
-                errors.extend(self._validate_medical_history(data))
-            elif table_name == 'laboratory_findings':
-                errors.extend(self._validate_laboratory_findings(data))
-            elif table_name == 'urine_tests':
-                errors.extend(self._validate_urine_tests(data))
-            elif table_name == 'physical_examination':
-                errors.extend(self._validate_physical_examination(data))
-            elif table_name == 'abnormal_findings':
-                errors.extend(self._validate_abnormal_findings(data))
-            elif table_name == 'assessments':
-                errors.extend(self._validate_assessments(data))
-            elif table_name == 'certifications':
-                errors.extend(self._validate_certifications(data))
-            
-            # Common field validation for all tables
-            errors.extend(self._validate_common_fields(data))
-            
+            errors = validator(data)
         except Exception as e:
-            errors.append(f"Validation error: {str(e)}")
+            errors = [f"Validation error: {str(e)}"]
         
         return {
             "valid": len(errors) == 0,
             "errors": errors
         }
     
+    def _compile_validator(self, table_name: Optional[str]) -> Callable[[Dict[str, Any]], List[str]]:
+        """Build the validator for a table once: its table-specific checks plus the common fields."""
+        table_check = self._dispatch.get(table_name)
+        validate_common = self._validate_common_fields
+        
+        # The common checks only look at exam_id, so skip the call when it is absent
+        if table_check is None:
+            return lambda data: validate_common(data) if 'exam_id' in data else []
+        
+        def validate(data: Dict[str, Any]) -> List[str]:
+            errors = table_check(data)
+            if 'exam_id' in data:
+                errors.extend(validate_common(data))
+            return errors
+        
+        return validate
+    
     def _validate_examination_record(self, data: Dict[str, Any]) -> List[str]:
         """Validate main examination record."""
         errors = []
         
         # Exam type validation
-        if 'exam_type' in data and data['exam_type'] not in self.exam_types:
-            errors.append(f"exam_type must be one of: {', '.join(self.exam_types)} (PE=Physical, RE=Re-examination, SE=Special, TE=Termination)")
+        exam_type = data.get('exam_type')
+        if exam_type is not None and not _is_one_of(exam_type, self._EXAM_TYPES_SET):
+            errors.append(self._EXAM_TYPE_ERR)
         
         # SSN validation
-        if 'patient_ssn' in data and data['patient_ssn']:
-            if not self._validate_ssn_format(data['patient_ssn']):
+        patient_ssn = data.get('patient_ssn')
+        if patient_ssn:
+            if not isinstance(patient_ssn, str) or _SSN_RE.fullmatch(patient_ssn) is None:
                 errors.append("patient_ssn must be in format XXX-XX-XXXX")
         
         # Required fields for examination
-        required_fields = ['exam_type', 'exam_date', 'patient_last_name', 'patient_first_name', 'patient_ssn', 'patient_dob']
-        for field in required_fields:
-            if field not in data or not data[field]:
+        for field in _REQUIRED_EXAM_FIELDS:
+            if not data.get(field):
                 errors.append(f"Required field missing: {field}")
         
         return errors
@@ -91,14 +158,9 @@ class ValidationService:
         errors = []
         
         # Validate Yes/No fields
-        yes_no_fields = [
-            'cancer_history', 'radiation_therapy', 'chemotherapy', 
-            'radioactive_drugs', 'xray_studies', 'nuclear_medicine', 
-            'occupational_exposure'
-        ]
-        
-        for field in yes_no_fields:
-            if field in data and data[field] and data[field] not in ['Yes', 'No']:
+        for field in _YES_NO_FIELDS:
+            value = data.get(field)
+            if value and not _is_one_of(value, self._YES_NO):
                 errors.append(f"{field} must be 'Yes' or 'No'")
         
         # If cancer history is Yes, details should be provided
@@ -112,30 +174,32 @@ class ValidationService:
         errors = []
         
         # Hematocrit validation
-        if 'hematocrit' in data and data['hematocrit'] is not None:
-            hct = data['hematocrit']
+        hct = data.get('hematocrit')
+        if hct is not None:
             if not isinstance(hct, (int, float)) or hct < 0 or hct > 100:
                 errors.append("hematocrit must be a number between 0 and 100")
         
         # WBC count validation
-        if 'wbc_count' in data and data['wbc_count'] is not None:
-            wbc = data['wbc_count']
+        wbc = data.get('wbc_count')
+        if wbc is not None:
             if not isinstance(wbc, int) or wbc < 0 or wbc > 50000:
                 errors.append("wbc_count must be a positive integer less than 50,000")
         
         # Differential validation (should add up to 100)
-        diff_fields = ['differential_neutrophils', 'differential_lymphocytes', 
-                      'differential_monocytes', 'differential_eosinophils', 'differential_basophils']
-        
-        diff_values = []
-        for field in diff_fields:
-            if field in data and data[field] is not None:
-                if not isinstance(data[field], int) or data[field] < 0 or data[field] > 100:
-                    errors.append(f"{field} must be an integer between 0 and 100")
-                else:
-                    diff_values.append(data[field])
-        
-        if len(diff_values) > 1 and sum(diff_values) != 100:
+        # Sum valid percentages in the same pass that checks them
+        total = 0
+        count = 0
+        for field in _DIFF_FIELDS:
+            value = data.get(field)
+            if value is None:
+                continue
+            if not isinstance(value, int) or value < 0 or value > 100:
+                errors.append(f"{field} must be an integer between 0 and 100")
+                continue
+            total += value
+            count += 1
+        
+        if count > 1 and total != 100:
             errors.append("Differential percentages must sum to 100")
         
         return errors
@@ -144,9 +208,10 @@ class ValidationService:
         """Validate urine test results (block 12)."""
         errors = []
         
-        if 'dipstick_blood_result' in data and data['dipstick_blood_result']:
-            if data['dipstick_blood_result'] not in self.urine_results:
-                errors.append(f"dipstick_blood_result must be one of: {', '.join(self.urine_results)}")
+        dipstick_blood_result = data.get('dipstick_blood_result')
+        if dipstick_blood_result:
+            if not _is_one_of(dipstick_blood_result, self._URINE_SET):
+                errors.append(self._URINE_ERR)
         
         return errors
     
@@ -155,10 +220,10 @@ class ValidationService:
         errors = []
         
         # Status field validation
-        status_fields = ['thyroid_status', 'breast_status', 'testes_status', 'dre_status', 'skin_status']
-        for field in status_fields:
-            if field in data and data[field] and data[field] not in self.status_values:
-                errors.append(f"{field} must be one of: {', '.join(self.status_values)} (NML=Normal, ABN=Abnormal, NE=Not Examined)")
+        for field in _STATUS_FIELDS:
+            value = data.get(field)
+            if value and not _is_one_of(value, self._STATUS_SET):
+                errors.append(field + self._STATUS_ERR_SUFFIX)
         
         return errors
     
@@ -166,9 +231,10 @@ class ValidationService:
         """Validate abnormal findings (block 14)."""
         errors = []
         
-        if 'finding_category' in data and data['finding_category']:
-            if data['finding_category'] not in self.finding_categories:
-                errors.append(f"finding_category must be one of: {', '.join(self.finding_categories)} (CD=Considered Disqualifying, NCD=Not Considered Disqualifying)")
+        finding_category = data.get('finding_category')
+        if finding_category:
+            if not _is_one_of(finding_category, self._FINDING_SET):
+                errors.append(self._FINDING_ERR)
         
         return errors
     
@@ -176,10 +242,10 @@ class ValidationService:
         """Validate medical assessments (blocks 20a, 20b)."""
         errors = []
         
-        assessment_fields = ['initial_assessment', 'reab_final_determination']
-        for field in assessment_fields:
-            if field in data and data[field] and data[field] not in self.assessment_values:
-                errors.append(f"{field} must be one of: {', '.join(self.assessment_values)} (PQ=Physically Qualified, NPQ=Not Physically Qualified)")
+        for field in _ASSESSMENT_FIELDS:
+            value = data.get(field)
+            if value and not _is_one_of(value, self._ASSESSMENT_SET):
+                errors.append(field + self._ASSESSMENT_ERR_SUFFIX)
         
         return errors
     
@@ -188,10 +254,11 @@ class ValidationService:
         errors = []
         
         # Date validation
-        date_fields = ['examination_complete_date', 'review_date', 'patient_signature_date']
-        for field in date_fields:
-            if field in data and data[field]:
-                if not self._validate_date_format(data[field]):
+        for field in _DATE_FIELDS:
+            value = data.get(field)
+            if value:
+                # Only non-string values (e.g. date objects) need converting first
+                if _DATE_RE.fullmatch(value if isinstance(value, str) else str(value)) is None:
                     errors.append(f"{field} must be in YYYY-MM-DD format")
         
         return errors
@@ -201,32 +268,29 @@ class ValidationService:
         errors = []
         
         # Validate exam_id if present (must be positive integer)
-        if 'exam_id' in data and data['exam_id'] is not None:
-            if not isinstance(data['exam_id'], int) or data['exam_id'] <= 0:
+        exam_id = data.get('exam_id')
+        if exam_id is not None:
+            if not isinstance(exam_id, int) or exam_id <= 0:
                 errors.append("exam_id must be a positive integer")
         
         return errors
     
-    def _validate_ssn_format(self, ssn: str) -> bool:
-        """Validate SSN format (XXX-XX-XXXX)."""
-        pattern = r'^\d{3}-\d{2}-\d{4}$'
-        return bool(re.match(pattern, ssn))
-    
-    def _validate_date_format(self, date_str: str) -> bool:
-        """Validate date format (YYYY-MM-DD)."""
-        pattern = r'^\d{4}-\d{2}-\d{2}$'
-        return bool(re.match(pattern, str(date_str)))
-    
     def get_validation_rules(self, table_name: str) -> Dict[str, Any]:
-        """Get validation rules for a specific table."""
-        rules = {
+        """Get validation rules for a specific table (shared between calls, so treat as read-only)."""
+        return self._build_validation_rules().get(table_name, {})
+    
+    @classmethod
+    @lru_cache(maxsize=None)
+    def _build_validation_rules(cls) -> Dict[str, Dict[str, Any]]:
+        """Build the validation rules for every table, once per class since they only use class constants."""
+        return {
             'examinations': {
-                'exam_type': f"One of: {', '.join(self.exam_types)}",
+                'exam_type': f"One of: {cls._EXAM_TYPES_STR}",
                 'patient_ssn': "Format: XXX-XX-XXXX",
-                'required_fields': ['exam_type', 'exam_date', 'patient_last_name', 'patient_first_name', 'patient_ssn', 'patient_dob']
+                'required_fields': list(_REQUIRED_EXAM_FIELDS)
             },
             'medical_history': {
-                'yes_no_fields': ['cancer_history', 'radiation_therapy', 'chemotherapy', 'radioactive_drugs', 'xray_studies', 'nuclear_medicine', 'occupational_exposure'],
+                'yes_no_fields': list(_YES_NO_FIELDS),
                 'conditional_required': {'cancer_details': 'Required if cancer_history is Yes'}
             },
             'laboratory_findings': {
@@ -235,11 +299,13 @@ class ValidationService:
                 'differential': "Percentages must sum to 100"
             },
             'physical_examination': {
-                'status_fields': f"One of: {', '.join(self.status_values)} (NML=Normal, ABN=Abnormal, NE=Not Examined)"
+                'status_fields': f"One of: {cls._STATUS_STR} (NML=Normal, ABN=Abnormal, NE=Not Examined)"
             },
             'assessments': {
-                'assessment_fields': f"One of: {', '.join(self.assessment_values)} (PQ=Physically Qualified, NPQ=Not Physically Qualified)"
+                'assessment_fields': f"One of: {cls._ASSESSMENT_STR} (PQ=Physically Qualified, NPQ=Not Physically Qualified)"
             }
-        }
-        
-        return rules.get(table_name, {}) 
\ No newline at end of file
+        } 
+
+
+# Shared instance; its state is fixed rules and validators built at construction
+DEFAULT_VALIDATOR = ValidationService()
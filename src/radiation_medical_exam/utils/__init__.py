@@ -0,0 +1,6 @@
+"""
+Utility modules for PDF processing and NAVMED database access.
+"""
+
+# Upper bound on stored notes, shared by both servers so the summarize-notes prompt stays bounded
+MAX_NOTES = 1000
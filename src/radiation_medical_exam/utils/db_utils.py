@@ -28,7 +28,7 @@ class LogDatabase:
 
     def _execute_query(self, query: str, params: dict[str, Any] | None = None) -> list[dict[str, Any]]:
         """Execute a SQL query and return results as a list of dictionaries"""
-        logger.debug(f"Executing query: {query}")
+        logger.debug("Executing query: %s", query)
         try:
             with closing(sqlite3.connect(self.db_path)) as conn:
                 conn.row_factory = sqlite3.Row
@@ -41,19 +41,19 @@ class LogDatabase:
                     if query.strip().upper().startswith(('INSERT', 'UPDATE', 'DELETE', 'CREATE', 'DROP', 'ALTER')):
                         conn.commit()
                         affected = cursor.rowcount
-                        logger.debug(f"Write query affected {affected} rows")
+                        logger.debug("Write query affected %s rows", affected)
                         return [{"affected_rows": affected}]
 
                     results = [dict(row) for row in cursor.fetchall()]
-                    logger.debug(f"Read query returned {len(results)} rows")
+                    logger.debug("Read query returned %s rows", len(results))
                     return results
         except Exception as e:
-            logger.error(f"Database error executing query: {e}")
+            logger.error("Database error executing query: %s", e)
             raise
 
     def _synthesize_memo(self) -> str:
         """Synthesizes business insights into a formatted memo"""
-        logger.debug(f"Synthesizing memo with {len(self.insights)} insights")
+        logger.debug("Synthesizing memo with %s insights", len(self.insights))
         if not self.insights:
             return "No business insights have been discovered yet."
 
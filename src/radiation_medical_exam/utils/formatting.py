@@ -0,0 +1,21 @@
+"""
+Text formatting helpers for NAVMED examination records in tool responses.
+"""
+from typing import Any, Dict, Optional, Tuple
+
+# Bullet-list templates keyed by (column names, skipped column). The NAVMED schema is
+# fixed, so each table's layout is compiled into a template once and reused per record.
+_RECORD_TEMPLATES: Dict[Tuple[Tuple[str, ...], Optional[str]], str] = {}
+
+
+def format_record(record: Dict[str, Any], skip: Optional[str] = None) -> str:
+    """Format a record as '  • **column:** value' lines, omitting the `skip` column."""
+    columns = tuple(record)
+    template = _RECORD_TEMPLATES.get((columns, skip))
+    if template is None:
+        template = _RECORD_TEMPLATES[(columns, skip)] = "".join(
+            "  • **" + column.replace("{", "{{").replace("}", "}}") + ":** {" + str(i) + "}\n"
+            for i, column in enumerate(columns)
+            if column != skip
+        )
+    return template.format(*record.values())
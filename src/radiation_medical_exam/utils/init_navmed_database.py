@@ -18,14 +18,31 @@ import sqlite3
 import argparse
 import os
 import sys
+from contextlib import closing
 from pathlib import Path
 from datetime import datetime
 
 # Default database path relative to this script
 DEFAULT_DB_PATH = Path(__file__).parent.parent / "data" / "navmed_radiation_exam.db"
 
+# Connection settings for initialization, applied in one script before any table is created
+# (page_size only takes effect on an empty database)
+INIT_PRAGMAS_SQL = """
+PRAGMA page_size = 8192;
+PRAGMA cache_size = -20000;
+PRAGMA foreign_keys = ON;
+"""
+
+# Added only when the file is new: a failed fresh init is simply re-run, so the journal
+# stays in memory and fsyncs are skipped. A recreate keeps durable settings, since a
+# crash there would otherwise corrupt the existing database.
+FRESH_INIT_PRAGMAS_SQL = """
+PRAGMA journal_mode = MEMORY;
+PRAGMA synchronous = OFF;
+"""
+
 # SQL Schema for NAVMED 6470/13 form
-SCHEMA_SQL = """
+SCHEMA_TABLES_SQL = """
 -- NAVMED 6470/13 Ionizing Radiation Medical Examination Database Schema
 
 -- Main examination record table
@@ -57,8 +74,7 @@ CREATE TABLE examining_facilities (
 
 -- Medical history responses (blocks 3-10)
 CREATE TABLE medical_history (
-    history_id INTEGER PRIMARY KEY AUTOINCREMENT,
-    exam_id INTEGER,
+    exam_id INTEGER PRIMARY KEY, -- One row per examination, so exam_id is the row key
     personal_history_cancer BOOLEAN,
     history_radiation_exposure BOOLEAN,
     history_anemia_hematuria BOOLEAN,
@@ -73,8 +89,7 @@ CREATE TABLE medical_history (
 
 -- Laboratory findings (block 11)
 CREATE TABLE laboratory_findings (
-    lab_id INTEGER PRIMARY KEY AUTOINCREMENT,
-    exam_id INTEGER,
+    exam_id INTEGER PRIMARY KEY, -- One row per examination, so exam_id is the row key
     evaluation_date DATE,
     hct_result DECIMAL(5,2),
     hct_lab_range VARCHAR(50),
@@ -113,8 +128,7 @@ CREATE TABLE additional_studies (
 
 -- Physical examination findings (blocks 15-19)
 CREATE TABLE physical_examination (
-    physical_id INTEGER PRIMARY KEY AUTOINCREMENT,
-    exam_id INTEGER,
+    exam_id INTEGER PRIMARY KEY, -- One row per examination, so exam_id is the row key
     thyroid_status VARCHAR(3) CHECK (thyroid_status IN ('NML', 'ABN', 'NE')),
     breast_status VARCHAR(3) CHECK (breast_status IN ('NML', 'ABN', 'NE')), -- Female ≥ 40
     testes_status VARCHAR(3) CHECK (testes_status IN ('NML', 'ABN', 'NE')),
@@ -135,8 +149,7 @@ CREATE TABLE abnormal_findings (
 
 -- Assessment and qualification status (blocks 20a, 20b)
 CREATE TABLE assessments (
-    assessment_id INTEGER PRIMARY KEY AUTOINCREMENT,
-    exam_id INTEGER,
+    exam_id INTEGER PRIMARY KEY, -- One row per examination, so exam_id is the row key
     initial_assessment VARCHAR(3) CHECK (initial_assessment IN ('PQ', 'NPQ')), -- Physically Qualified / Not Physically Qualified
     reab_submitted_date DATE,
     bumed_letter_serial VARCHAR(50),
@@ -147,8 +160,7 @@ CREATE TABLE assessments (
 
 -- Signatures and certifications (blocks 21-23)
 CREATE TABLE certifications (
-    cert_id INTEGER PRIMARY KEY AUTOINCREMENT,
-    exam_id INTEGER,
+    exam_id INTEGER PRIMARY KEY, -- One row per examination, so exam_id is the row key
     patient_signature_date DATE,
     examiner_name VARCHAR(200),
     examiner_signature_date DATE,
@@ -157,60 +169,83 @@ CREATE TABLE certifications (
     examination_complete_date DATE, -- This is the official completion date per instructions
     FOREIGN KEY (exam_id) REFERENCES examinations(exam_id)
 );
+"""
 
+# Indexes are created after any sample data so rows are indexed in one pass
+SCHEMA_INDEXES_SQL = """
 -- Create indexes for performance
-CREATE INDEX idx_examinations_patient ON examinations(patient_last_name, patient_first_name, patient_ssn);
+-- patient_dob trails the name and SSN so identity checks can be answered from the index
+CREATE INDEX idx_examinations_patient ON examinations(patient_last_name, patient_first_name, patient_ssn, patient_dob);
 CREATE INDEX idx_examinations_date ON examinations(exam_date);
 CREATE INDEX idx_examinations_facility ON examinations(facility_id);
-CREATE INDEX idx_medical_history_exam ON medical_history(exam_id);
-CREATE INDEX idx_laboratory_findings_exam ON laboratory_findings(exam_id);
 CREATE INDEX idx_urine_tests_exam ON urine_tests(exam_id);
-CREATE INDEX idx_physical_examination_exam ON physical_examination(exam_id);
-CREATE INDEX idx_assessments_exam ON assessments(exam_id);
-CREATE INDEX idx_certifications_exam ON certifications(exam_id);
 CREATE INDEX idx_abnormal_findings_exam ON abnormal_findings(exam_id);
 CREATE INDEX idx_additional_studies_exam ON additional_studies(exam_id);
 """
 
-# Sample data for testing
-SAMPLE_DATA_SQL = """
--- Insert sample examining facility
-INSERT INTO examining_facilities (facility_name, mailing_address, phone_number) 
-VALUES ('Naval Medical Center Portsmouth', '620 John Paul Jones Circle, Portsmouth, VA 23708', '(757) 953-1110');
-
-INSERT INTO examining_facilities (facility_name, mailing_address, phone_number) 
-VALUES ('Naval Hospital Camp Lejeune', '100 Brewster Blvd, Camp Lejeune, NC 28547', '(910) 450-4300');
-
--- Insert sample examination record
-INSERT INTO examinations (exam_type, exam_date, patient_last_name, patient_first_name, patient_middle_initial, 
-                         patient_ssn, patient_dob, command_unit, rank_grade, department_service, facility_id)
-VALUES ('PE', '2024-01-15', 'Smith', 'John', 'A', '123-45-6789', '1985-05-20', 
-        'USS Enterprise', 'E-5', 'Nuclear Engineering', 1);
-
--- Insert sample medical history
-INSERT INTO medical_history (exam_id, personal_history_cancer, history_radiation_exposure, history_anemia_hematuria,
-                           history_cancer_therapy, history_radiation_therapy, history_unsealed_sources,
-                           history_radiopharmaceutical_therapy, significant_illness_changes, significant_illness_details)
-VALUES (1, 0, 0, 0, 0, 0, 0, 0, 0, NULL);
-
--- Insert sample laboratory findings
-INSERT INTO laboratory_findings (exam_id, evaluation_date, hct_result, hct_lab_range, wbc_result, wbc_lab_range,
-                               wbc_facility, differential_required)
-VALUES (1, '2024-01-15', 42.5, '37.0-47.0', 6500, '4500-11000', 'NMCP Lab', 0);
-
--- Insert sample physical examination
-INSERT INTO physical_examination (exam_id, thyroid_status, breast_status, testes_status, dre_status, skin_status)
-VALUES (1, 'NML', 'NE', 'NML', 'NE', 'NML');
-
--- Insert sample assessment
-INSERT INTO assessments (exam_id, initial_assessment)
-VALUES (1, 'PQ');
-
--- Insert sample certification
-INSERT INTO certifications (exam_id, patient_signature_date, examiner_name, examiner_signature_date,
-                          reviewing_physician_name, reviewing_physician_signature_date, examination_complete_date)
-VALUES (1, '2024-01-15', 'Dr. Jane Medical', '2024-01-15', 'Dr. Jane Medical', '2024-01-15', '2024-01-15');
-"""
+# Sample data for testing: (table, columns, rows), inserted in this order
+SAMPLE_DATA = (
+    # Sample examining facilities
+    ('examining_facilities',
+     ('facility_name', 'mailing_address', 'phone_number'),
+     [('Naval Medical Center Portsmouth', '620 John Paul Jones Circle, Portsmouth, VA 23708', '(757) 953-1110'),
+      ('Naval Hospital Camp Lejeune', '100 Brewster Blvd, Camp Lejeune, NC 28547', '(910) 450-4300')]),
+    
+    # Sample examination record
+    ('examinations',
+     ('exam_type', 'exam_date', 'patient_last_name', 'patient_first_name', 'patient_middle_initial',
+      'patient_ssn', 'patient_dob', 'command_unit', 'rank_grade', 'department_service', 'facility_id'),
+     [('PE', '2024-01-15', 'Smith', 'John', 'A', '123-45-6789', '1985-05-20',
+       'USS Enterprise', 'E-5', 'Nuclear Engineering', 1)]),
+    
+    # Sample medical history
+    ('medical_history',
+     ('exam_id', 'personal_history_cancer', 'history_radiation_exposure', 'history_anemia_hematuria',
+      'history_cancer_therapy', 'history_radiation_therapy', 'history_unsealed_sources',
+      'history_radiopharmaceutical_therapy', 'significant_illness_changes', 'significant_illness_details'),
+     [(1, 0, 0, 0, 0, 0, 0, 0, 0, None)]),
+    
+    # Sample laboratory findings
+    ('laboratory_findings',
+     ('exam_id', 'evaluation_date', 'hct_result', 'hct_lab_range', 'wbc_result', 'wbc_lab_range',
+      'wbc_facility', 'differential_required'),
+     [(1, '2024-01-15', 42.5, '37.0-47.0', 6500, '4500-11000', 'NMCP Lab', 0)]),
+    
+    # Sample physical examination
+    ('physical_examination',
+     ('exam_id', 'thyroid_status', 'breast_status', 'testes_status', 'dre_status', 'skin_status'),
+     [(1, 'NML', 'NE', 'NML', 'NE', 'NML')]),
+    
+    # Sample assessment
+    ('assessments',
+     ('exam_id', 'initial_assessment'),
+     [(1, 'PQ')]),
+    
+    # Sample certification
+    ('certifications',
+     ('exam_id', 'patient_signature_date', 'examiner_name', 'examiner_signature_date',
+      'reviewing_physician_name', 'reviewing_physician_signature_date', 'examination_complete_date'),
+     [(1, '2024-01-15', 'Dr. Jane Medical', '2024-01-15', 'Dr. Jane Medical', '2024-01-15', '2024-01-15')]),
+)
+
+
+def _iter_statements(script: str):
+    """Yield the complete SQL statements in a script, so they can run inside an open transaction."""
+    statement = ""
+    for line in script.splitlines(keepends=True):
+        statement += line
+        if sqlite3.complete_statement(statement):
+            yield statement.strip()
+            statement = ""
+
+
+def _insert_sample_data(conn: sqlite3.Connection) -> None:
+    """Insert the sample rows with one multi-row INSERT per table."""
+    for table, columns, rows in SAMPLE_DATA:
+        row_placeholders = f"({', '.join('?' * len(columns))})"
+        values = ", ".join([row_placeholders] * len(rows))
+        params = [value for row in rows for value in row]
+        conn.execute(f"INSERT INTO {table} ({', '.join(columns)}) VALUES {values}", params)
 
 
 def create_database(db_path: Path, force: bool = False, include_sample_data: bool = True) -> bool:
@@ -236,59 +271,72 @@ def create_database(db_path: Path, force: bool = False, include_sample_data: boo
     db_path.parent.mkdir(parents=True, exist_ok=True)
     
     try:
-        # If database exists and force is True, we'll drop and recreate tables
-        if db_path.exists() and force:
-            print(f"Force recreating database: {db_path}")
-            with sqlite3.connect(db_path) as conn:
-                # Get list of existing tables
-                cursor = conn.execute("SELECT name FROM sqlite_master WHERE type='table'")
-                existing_tables = [row[0] for row in cursor.fetchall()]
-                
-                # Drop existing tables (in reverse order to handle foreign keys)
-                tables_to_drop = [
-                    'certifications', 'assessments', 'abnormal_findings', 
-                    'physical_examination', 'additional_studies', 'urine_tests',
-                    'laboratory_findings', 'medical_history', 'examinations',
-                    'examining_facilities'
-                ]
-                
-                for table in tables_to_drop:
-                    if table in existing_tables:
-                        conn.execute(f"DROP TABLE IF EXISTS {table}")
-                        print(f"Dropped existing table: {table}")
-                
-                # Drop any remaining tables that might exist
-                for table in existing_tables:
-                    if table not in tables_to_drop and table != 'sqlite_sequence':
-                        try:
-                            conn.execute(f"DROP TABLE IF EXISTS {table}")
-                            print(f"Dropped additional table: {table}")
-                        except Exception as e:
-                            print(f"Warning: Could not drop {table}: {e}")
-                
-                conn.commit()
-        else:
-            print(f"Creating database: {db_path}")
+        recreate = db_path.exists() and force
         
-        with sqlite3.connect(db_path) as conn:
-            # Enable foreign key constraints
-            conn.execute("PRAGMA foreign_keys = ON")
+        # One connection does the drop, create and verify steps; isolation_level=None
+        # leaves transaction control to the explicit BEGIN/COMMIT below
+        with closing(sqlite3.connect(db_path, isolation_level=None)) as conn:
+            conn.executescript(INIT_PRAGMAS_SQL)
+            if not recreate:
+                conn.executescript(FRESH_INIT_PRAGMAS_SQL)
             
-            # Execute schema creation
-            print("Creating tables and indexes...")
-            conn.executescript(SCHEMA_SQL)
+            # Drops, schema and sample data form one transaction, so a failure part way
+            # leaves an existing database as it was
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # If database exists and force is True, we'll drop and recreate tables
+                if recreate:
+                    print(f"Force recreating database: {db_path}")
+                    # Get list of existing tables
+                    cursor = conn.execute("SELECT name FROM sqlite_master WHERE type='table'")
+                    existing_tables = [row[0] for row in cursor.fetchall()]
+                    
+                    # Drop existing tables (in reverse order to handle foreign keys)
+                    tables_to_drop = [
+                        'certifications', 'assessments', 'abnormal_findings', 
+                        'physical_examination', 'additional_studies', 'urine_tests',
+                        'laboratory_findings', 'medical_history', 'examinations',
+                        'examining_facilities'
+                    ]
+                    
+                    # Check foreign keys at commit, once every dependent table is gone
+                    conn.execute("PRAGMA defer_foreign_keys = ON")
+                    for table in tables_to_drop:
+                        if table in existing_tables:
+                            conn.execute(f"DROP TABLE IF EXISTS {table}")
+                            print(f"Dropped existing table: {table}")
+                    
+                    # Drop any remaining tables that might exist
+                    for table in existing_tables:
+                        if table not in tables_to_drop and table != 'sqlite_sequence':
+                            try:
+                                conn.execute(f"DROP TABLE IF EXISTS {table}")
+                                print(f"Dropped additional table: {table}")
+                            except Exception as e:
+                                print(f"Warning: Could not drop {table}: {e}")
+                else:
+                    print(f"Creating database: {db_path}")
+                
+                print("Creating tables and indexes...")
+                for statement in _iter_statements(SCHEMA_TABLES_SQL):
+                    conn.execute(statement)
+                if include_sample_data:
+                    print("Inserting sample data...")
+                    _insert_sample_data(conn)
+                for statement in _iter_statements(SCHEMA_INDEXES_SQL):
+                    conn.execute(statement)
+                conn.execute("COMMIT")
+            except BaseException:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                raise
             
-            # Insert sample data if requested
-            if include_sample_data:
-                print("Inserting sample data...")
-                conn.executescript(SAMPLE_DATA_SQL)
+            # Leave the file in WAL mode, which the server's connections run in
+            conn.execute("PRAGMA journal_mode = WAL")
             
-            conn.commit()
+            print(f"Database created successfully: {db_path}")
             
-        print(f"Database created successfully: {db_path}")
-        
-        # Verify database creation
-        with sqlite3.connect(db_path) as conn:
+            # Verify database creation
             cursor = conn.execute("SELECT name FROM sqlite_master WHERE type='table'")
             tables = [row[0] for row in cursor.fetchall()]
             navmed_tables = [t for t in tables if t != 'sqlite_sequence']
@@ -332,7 +380,8 @@ def verify_database(db_path: Path) -> bool:
     ]
     
     try:
-        with sqlite3.connect(db_path) as conn:
+        # Verification only reads, so open read-only: no write transaction or journal setup
+        with closing(sqlite3.connect(f"{db_path.resolve().as_uri()}?mode=ro", uri=True)) as conn:
             cursor = conn.execute("SELECT name FROM sqlite_master WHERE type='table'")
             existing_tables = [row[0] for row in cursor.fetchall()]
             
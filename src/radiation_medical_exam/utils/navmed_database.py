@@ -1,13 +1,117 @@
+import queue
+import re
 import sqlite3
-import json
-from datetime import datetime
-from typing import Optional, Any, Dict, List, Union
+from collections.abc import Hashable
+from typing import Optional, Any, Callable, Dict, FrozenSet, Iterable, Iterator, List, Tuple
 from pathlib import Path
-from contextlib import closing
+from contextlib import closing, contextmanager
+from functools import lru_cache
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Idle connections kept for reuse; concurrent callers beyond this open short-lived extras
+POOL_SIZE = 4
+# Prepared statements kept per connection (sqlite3 defaults to 128)
+CACHED_STATEMENTS = 256
+
+# Examination summary with facility, initial assessment and completion date, by exam or patient
+SUMMARY_SELECT_SQL = (
+    "SELECT e.*, f.facility_name, a.initial_assessment, c.examination_complete_date"
+    " FROM examinations e"
+    " LEFT JOIN examining_facilities f ON e.facility_id = f.facility_id"
+    " LEFT JOIN assessments a ON e.exam_id = a.exam_id"
+    " LEFT JOIN certifications c ON e.exam_id = c.exam_id"
+)
+SUMMARY_BY_EXAM_SQL = SUMMARY_SELECT_SQL + " WHERE e.exam_id = ?"
+SUMMARY_BY_SSN_SQL = SUMMARY_SELECT_SQL + " WHERE e.patient_ssn = ? ORDER BY e.exam_date DESC"
+
+# Applied once when a pooled connection is opened
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA cache_size = -65536",  # 64 MB page cache
+    "PRAGMA mmap_size = 268435456",  # 256 MB memory-mapped I/O
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA foreign_keys = ON",  # Off by default and set per connection
+)
+
+# Tables holding per-exam sections, in the order complete examinations list them
+RELATED_TABLES = (
+    'medical_history', 'laboratory_findings', 'urine_tests',
+    'additional_studies', 'physical_examination', 'abnormal_findings',
+    'assessments', 'certifications'
+)
+
+# Allowed values checked by the field validators below
+EXAM_TYPES = frozenset(('PE', 'RE', 'SE', 'TE'))
+STATUS_FIELDS = frozenset(('thyroid_status', 'breast_status', 'testes_status', 'dre_status', 'skin_status'))
+STATUS_VALUES = frozenset(('NML', 'ABN', 'NE'))
+ASSESSMENT_FIELDS = frozenset(('initial_assessment', 'reab_final_determination'))
+ASSESSMENT_VALUES = frozenset(('PQ', 'NPQ'))
+FINDING_CATEGORIES = frozenset(('CD', 'NCD'))
+URINE_RESULTS = frozenset(('Negative', 'Positive', 'Not Performed'))
+# Nine digits, dashes optional: XXX-XX-XXXX or XXXXXXXXX
+SSN_RE = re.compile(r'\d{3}-?\d{2}-?\d{4}')
+
+def _one_of(allowed: FrozenSet[str], message: str) -> Callable[[Any], Optional[str]]:
+    """Build a validator returning message when a value is outside allowed"""
+    # JSON lists and dicts are unhashable, so they get the field's message rather than a TypeError
+    return lambda value: None if isinstance(value, Hashable) and value in allowed else message
+
+def _check_ssn(value: Any) -> Optional[str]:
+    """Validate SSN format; empty values are left to the required-field check"""
+    if value and not (isinstance(value, str) and SSN_RE.fullmatch(value)):
+        return "patient_ssn must be in format XXX-XX-XXXX"
+    return None
+
+# NAVMED 6470/13 business rules by column, each returning an error message or None
+FIELD_VALIDATORS: Dict[str, Callable[[Any], Optional[str]]] = {
+    'exam_type': _one_of(EXAM_TYPES, "exam_type must be one of: PE (Physical), RE (Re-examination), SE (Special), TE (Termination)"),
+    **{field: _one_of(STATUS_VALUES, f"{field} must be one of: NML (Normal), ABN (Abnormal), NE (Not Examined)")
+       for field in STATUS_FIELDS},
+    **{field: _one_of(ASSESSMENT_VALUES, f"{field} must be one of: PQ (Physically Qualified), NPQ (Not Physically Qualified)")
+       for field in ASSESSMENT_FIELDS},
+    'finding_category': _one_of(FINDING_CATEGORIES, "finding_category must be one of: CD (Considered Disqualifying), NCD (Not Considered Disqualifying)"),
+    'dipstick_blood_result': _one_of(URINE_RESULTS, "dipstick_blood_result must be one of: Negative, Positive, Not Performed"),
+    'patient_ssn': _check_ssn,
+}
+
+@lru_cache(maxsize=256)
+def _insert_sql(table_name: str, columns: Tuple[str, ...]) -> str:
+    """Build the INSERT statement for a table and sorted column tuple, once per shape"""
+    placeholders = ', '.join(['?'] * len(columns))
+    return f"INSERT INTO {table_name} ({', '.join(columns)}) VALUES ({placeholders})"
+
+@lru_cache(maxsize=256)
+def _select_sql(table_name: str, filter_columns: Tuple[str, ...]) -> str:
+    """Build the filtered, newest-first SELECT for a table and sorted filter columns, once per shape"""
+    query = f"SELECT * FROM {table_name}"
+    if filter_columns:
+        query += " WHERE " + " AND ".join(f"{column} = ?" for column in filter_columns)
+    return query + " ORDER BY created_at DESC LIMIT ?"
+
+def _close_optimized(conn: sqlite3.Connection) -> None:
+    """Close a connection, first letting SQLite refresh planner statistics its queries showed were stale"""
+    try:
+        conn.execute("PRAGMA optimize")
+    except sqlite3.Error as e:
+        logger.debug("PRAGMA optimize skipped: %s", e)
+    conn.close()
+
+def _bind_row(data: Dict[str, Any], column_order: Optional[Iterable[str]] = None) -> Tuple[Tuple[str, ...], tuple]:
+    """
+    Return the row's columns and its values in that order, so key order doesn't split statements.
+    
+    With column_order (a table's columns in schema order) the columns follow it in one pass
+    and keys outside the schema are dropped; otherwise the keys are sorted.
+    """
+    if column_order is None:
+        columns = tuple(sorted(data))
+    else:
+        columns = tuple([column for column in column_order if column in data])
+    return columns, tuple([data[column] for column in columns])
+
 class NavmedDatabase:
     """
     Database interface for NAVMED 6470/13 Ionizing Radiation Medical Examination data.
@@ -29,13 +133,87 @@ class NavmedDatabase:
             'physical_examination', 'abnormal_findings', 'assessments',
             'certifications'
         ]
+        # Idle connections, opened on demand so a missing database file isn't created early;
+        # WAL lets pooled connections read concurrently while one of them writes
+        self._pool: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue(maxsize=POOL_SIZE)
+        # Table schema, its required columns and columns by name, read once per table;
+        # only DDL changes them
+        self._schema_cache: Dict[str, Tuple[Dict[str, Any], List[str], Dict[str, Dict[str, Any]]]] = {}
+        # Each table's (column, validator) pairs, so validation never branches on field names
+        self._validators_by_table: Dict[str, List[Tuple[str, Callable[[Any], Optional[str]]]]] = {}
+    
+    def _open_connection(self) -> sqlite3.Connection:
+        """Open a new connection and apply the connection pragmas"""
+        conn = sqlite3.connect(
+            self.db_path, check_same_thread=False, isolation_level=None,
+            cached_statements=CACHED_STATEMENTS,
+        )
+        conn.row_factory = sqlite3.Row
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        return conn
+    
+    @contextmanager
+    def _connection(self) -> Iterator[sqlite3.Connection]:
+        """Check a connection out of the pool for exclusive use, returning it afterwards"""
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            conn = self._open_connection()
+        try:
+            yield conn
+        finally:
+            try:
+                self._pool.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+    
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """
+        Run the enclosed statements on one pooled connection as a single transaction.
+        
+        BEGIN IMMEDIATE takes the write lock up front, so a concurrent writer waits at the
+        start instead of failing to upgrade mid-transaction. The block is committed on exit
+        or rolled back if it raises.
+        """
+        with self._connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+                conn.execute("COMMIT")
+            except BaseException:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                raise
+    
+    def close(self, optimize: bool = True) -> None:
+        """
+        Close the idle pooled connections.
+        
+        Pass optimize=False when the database is about to be dropped or replaced, since
+        refreshing its planner statistics would be wasted work.
+        """
+        while True:
+            try:
+                conn = self._pool.get_nowait()
+            except queue.Empty:
+                break
+            if optimize:
+                _close_optimized(conn)
+            else:
+                conn.close()
         
-    def _execute_query(self, query: str, params: tuple = None) -> List[Dict[str, Any]]:
-        """Execute a SQL query and return results as a list of dictionaries"""
-        logger.debug(f"Executing query: {query}")
+    def _execute_query(self, query: str, params: tuple = None, as_dicts: bool = True) -> List[Dict[str, Any]]:
+        """
+        Execute a SQL query and return results as a list of dictionaries.
+        
+        Internal reads that only index rows by column name pass as_dicts=False to get the
+        sqlite3.Row objects as fetched, skipping a dict copy per row.
+        """
+        logger.debug("Executing query: %s", query)
         try:
-            with closing(sqlite3.connect(self.db_path)) as conn:
-                conn.row_factory = sqlite3.Row
+            with self._connection() as conn:
                 with closing(conn.cursor()) as cursor:
                     if params:
                         cursor.execute(query, params)
@@ -43,33 +221,68 @@ class NavmedDatabase:
                         cursor.execute(query)
 
                     if query.strip().upper().startswith(('INSERT', 'UPDATE', 'DELETE')):
-                        conn.commit()
                         return {"affected_rows": cursor.rowcount, "last_insert_id": cursor.lastrowid}
 
-                    results = [dict(row) for row in cursor.fetchall()]
-                    logger.debug(f"Query returned {len(results)} rows")
+                    results = cursor.fetchall()
+                    if as_dicts:
+                        results = [dict(row) for row in results]
+                    logger.debug("Query returned %s rows", len(results))
                     return results
         except Exception as e:
-            logger.error(f"Database error executing query: {e}")
+            logger.error("Database error executing query: %s", e)
             raise
 
+    def get_existing_tables(self) -> List[str]:
+        """Get the names of the user tables currently in the database"""
+        rows = self._execute_query("SELECT name FROM sqlite_master WHERE type='table'", as_dicts=False)
+        return [row['name'] for row in rows if row['name'] != 'sqlite_sequence']
+
     def get_table_schema(self, table_name: str) -> Dict[str, Any]:
         """Get the schema information for a specific table"""
+        # Shallow copy: callers may add or replace top-level keys, but the column and
+        # foreign key dicts inside are the cached ones and must not be modified
+        return dict(self._get_cached_schema(table_name)[0])
+
+    def clear_schema_cache(self) -> None:
+        """Forget cached table schemas, e.g. after the database is re-created"""
+        self._schema_cache.clear()
+        self._validators_by_table.clear()
+
+    def _get_cached_schema(self, table_name: str) -> Tuple[Dict[str, Any], List[str], Dict[str, Dict[str, Any]]]:
+        """Get a table's schema, required columns and columns by name, running the PRAGMAs on first use only"""
+        cached = self._schema_cache.get(table_name)
+        if cached is None:
+            schema = self._read_table_schema(table_name)
+            required_columns = [col['name'] for col in schema['columns'] if col['notnull'] and col['dflt_value'] is None and col['name'] != 'created_at' and col['name'] != 'updated_at']
+            # exam_id is the rowid of the one-per-exam tables, so SQLite would fill in a missing one
+            # with the next free id and attach the row to whichever exam gets that id
+            if table_name in RELATED_TABLES:
+                required_columns.append('exam_id')
+            columns_by_name = {col['name']: col for col in schema['columns']}
+            cached = (schema, required_columns, columns_by_name)
+            # A missing table has no columns; don't cache that so it's seen once created
+            if schema['columns']:
+                self._schema_cache[table_name] = cached
+        return cached
+
+    def _read_table_schema(self, table_name: str) -> Dict[str, Any]:
+        """Read the schema information for a specific table from the database"""
         if table_name not in self.expected_tables:
             raise ValueError(f"Table '{table_name}' is not a valid NAVMED table")
         
         try:
             schema_query = f"PRAGMA table_info({table_name})"
-            columns = self._execute_query(schema_query)
+            columns = self._execute_query(schema_query, as_dicts=False)
             
             # Get foreign key information
             fk_query = f"PRAGMA foreign_key_list({table_name})"
-            foreign_keys = self._execute_query(fk_query)
+            foreign_keys = self._execute_query(fk_query, as_dicts=False)
             
+            # Rows are converted once here, since the schema is cached and handed to callers
             return {
                 "table_name": table_name,
-                "columns": columns,
-                "foreign_keys": foreign_keys,
+                "columns": [dict(row) for row in columns],
+                "foreign_keys": [dict(row) for row in foreign_keys],
                 "description": self._get_table_description(table_name)
             }
         except Exception as e:
@@ -93,68 +306,62 @@ class NavmedDatabase:
 
     def validate_exam_data(self, table_name: str, data: Dict[str, Any]) -> Dict[str, Any]:
         """Validate examination data before insertion"""
-        if table_name not in self.expected_tables:
-            return {"valid": False, "errors": [f"Invalid table name: {table_name}"]}
+        errors = self.validate_many(table_name, [data])[0]
+        return {"valid": len(errors) == 0, "errors": errors}
+
+    def validate_many(self, table_name: str, rows: List[Dict[str, Any]]) -> List[List[str]]:
+        """
+        Validate a batch of rows for one table, returning each row's errors (empty when valid).
         
-        errors = []
+        The schema and validators are looked up once for the batch, so bulk imports pay
+        only the per-field checks for each row.
+        """
+        if table_name not in self.expected_tables:
+            return [[f"Invalid table name: {table_name}"] for _ in rows]
         
         # Get table schema for validation
         try:
-            schema = self.get_table_schema(table_name)
-            required_columns = [col['name'] for col in schema['columns'] if col['notnull'] and col['dflt_value'] is None and col['name'] != 'created_at' and col['name'] != 'updated_at']
-            
-            # Check for required fields
-            missing_required = [col for col in required_columns if col not in data or data[col] is None]
-            if missing_required:
-                errors.append(f"Missing required fields: {', '.join(missing_required)}")
-            
-            # Validate data types and constraints
-            for column_name, value in data.items():
-                if value is not None:
-                    column_info = next((col for col in schema['columns'] if col['name'] == column_name), None)
-                    if not column_info:
-                        errors.append(f"Unknown column: {column_name}")
-                        continue
-                    
-                    # Validate based on NAVMED 6470/13 business rules
-                    errors.extend(self._validate_field_value(table_name, column_name, value, column_info))
-                    
+            _, required_columns, columns_by_name = self._get_cached_schema(table_name)
+            validators = self._get_validators(table_name, columns_by_name)
         except Exception as e:
-            errors.append(f"Validation error: {str(e)}")
-        
-        return {"valid": len(errors) == 0, "errors": errors}
-
-    def _validate_field_value(self, table_name: str, field_name: str, value: Any, column_info: Dict) -> List[str]:
-        """Validate specific field values based on NAVMED 6470/13 requirements"""
-        errors = []
-        
-        # Exam type validation (PE, RE, SE, TE)
-        if field_name == 'exam_type' and value not in ['PE', 'RE', 'SE', 'TE']:
-            errors.append("exam_type must be one of: PE (Physical), RE (Re-examination), SE (Special), TE (Termination)")
-        
-        # Status field validation (NML, ABN, NE)
-        status_fields = ['thyroid_status', 'breast_status', 'testes_status', 'dre_status', 'skin_status']
-        if field_name in status_fields and value not in ['NML', 'ABN', 'NE']:
-            errors.append(f"{field_name} must be one of: NML (Normal), ABN (Abnormal), NE (Not Examined)")
-        
-        # Assessment validation (PQ, NPQ)
-        if field_name in ['initial_assessment', 'reab_final_determination'] and value not in ['PQ', 'NPQ']:
-            errors.append(f"{field_name} must be one of: PQ (Physically Qualified), NPQ (Not Physically Qualified)")
-        
-        # Finding category validation (CD, NCD)
-        if field_name == 'finding_category' and value not in ['CD', 'NCD']:
-            errors.append("finding_category must be one of: CD (Considered Disqualifying), NCD (Not Considered Disqualifying)")
-        
-        # Urine test result validation
-        if field_name == 'dipstick_blood_result' and value not in ['Negative', 'Positive', 'Not Performed']:
-            errors.append("dipstick_blood_result must be one of: Negative, Positive, Not Performed")
+            return [[f"Validation error: {str(e)}"] for _ in rows]
         
-        # SSN format validation
-        if field_name == 'patient_ssn' and value:
-            if not isinstance(value, str) or len(value.replace('-', '')) != 9:
-                errors.append("patient_ssn must be in format XXX-XX-XXXX")
+        results = []
+        for data in rows:
+            errors = []
+            try:
+                # Check for required fields
+                missing_required = [col for col in required_columns if data.get(col) is None]
+                if missing_required:
+                    errors.append(f"Missing required fields: {', '.join(missing_required)}")
+                
+                # Validate data types and constraints
+                for column_name, value in data.items():
+                    if value is not None and column_name not in columns_by_name:
+                        errors.append(f"Unknown column: {column_name}")
+                
+                # Validate based on NAVMED 6470/13 business rules
+                for column_name, check in validators:
+                    value = data.get(column_name)
+                    if value is not None:
+                        message = check(value)
+                        if message:
+                            errors.append(message)
+            except Exception as e:
+                errors.append(f"Validation error: {str(e)}")
+            results.append(errors)
         
-        return errors
+        return results
+
+    def _get_validators(self, table_name: str, columns_by_name: Dict[str, Any]) -> List[Tuple[str, Callable[[Any], Optional[str]]]]:
+        """Get the table's (column, validator) pairs, resolved from its columns on first use"""
+        validators = self._validators_by_table.get(table_name)
+        if validators is None:
+            validators = [(column, FIELD_VALIDATORS[column]) for column in columns_by_name if column in FIELD_VALIDATORS]
+            # A missing table has no columns; don't cache that so it's seen once created
+            if columns_by_name:
+                self._validators_by_table[table_name] = validators
+        return validators
 
     def add_examination_data(self, table_name: str, data: Dict[str, Any]) -> Dict[str, Any]:
         """Add data to any NAVMED examination table with validation"""
@@ -164,12 +371,8 @@ class NavmedDatabase:
             if not validation["valid"]:
                 return {"success": False, "errors": validation["errors"]}
             
-            # Prepare insert query
-            columns = list(data.keys())
-            placeholders = ', '.join(['?' for _ in columns])
-            query = f"INSERT INTO {table_name} ({', '.join(columns)}) VALUES ({placeholders})"
-            
-            result = self._execute_query(query, tuple(data.values()))
+            columns, values = _bind_row(data, self._get_cached_schema(table_name)[2])
+            result = self._execute_query(_insert_sql(table_name, columns), values)
             
             return {
                 "success": True,
@@ -183,19 +386,14 @@ class NavmedDatabase:
     def get_examination_data(self, table_name: str, filters: Dict[str, Any] = None, limit: int = 10) -> List[Dict[str, Any]]:
         """Retrieve data from any NAVMED examination table with optional filtering"""
         try:
-            base_query = f"SELECT * FROM {table_name}"
-            params = []
-            
-            if filters:
-                conditions = []
-                for column, value in filters.items():
-                    conditions.append(f"{column} = ?")
-                    params.append(value)
-                base_query += " WHERE " + " AND ".join(conditions)
-            
-            base_query += f" ORDER BY created_at DESC LIMIT {limit}"
+            # Table and filter names are checked against the cached schema before reaching the SQL
+            _, _, columns_by_name = self._get_cached_schema(table_name)
+            filter_columns, params = _bind_row(filters or {})
+            unknown = [column for column in filter_columns if column not in columns_by_name]
+            if unknown:
+                raise ValueError(f"Unknown filter columns: {', '.join(unknown)}")
             
-            return self._execute_query(base_query, tuple(params) if params else None)
+            return self._execute_query(_select_sql(table_name, filter_columns), params + (int(limit),))
             
         except Exception as e:
             raise Exception(f"Error retrieving data from {table_name}: {str(e)}")
@@ -203,32 +401,39 @@ class NavmedDatabase:
     def get_complete_examination(self, exam_id: int) -> Dict[str, Any]:
         """Get complete examination data with all related records"""
         try:
-            # Get main examination record
-            exam_query = "SELECT * FROM examinations WHERE exam_id = ?"
-            examination = self._execute_query(exam_query, (exam_id,))
-            
-            if not examination:
-                return {"error": f"Examination with ID {exam_id} not found"}
-            
-            result = {"examination": examination[0]}
-            
-            # Get all related records
-            related_tables = [
-                'medical_history', 'laboratory_findings', 'urine_tests',
-                'additional_studies', 'physical_examination', 'abnormal_findings',
-                'assessments', 'certifications'
-            ]
-            
-            for table in related_tables:
-                query = f"SELECT * FROM {table} WHERE exam_id = ?"
-                records = self._execute_query(query, (exam_id,))
-                result[table] = records
+            # Every section is read on one connection and cursor, inside one read transaction
+            # so the sections come from the same snapshot
+            with self._connection() as conn:
+                with closing(conn.cursor()) as cursor:
+                    cursor.execute("BEGIN")
+                    try:
+                        exam_row = cursor.execute("SELECT * FROM examinations WHERE exam_id = ?", (exam_id,)).fetchone()
+                        if exam_row is None:
+                            return {"error": f"Examination with ID {exam_id} not found"}
+                        
+                        result = {"examination": dict(exam_row)}
+                        for table in RELATED_TABLES:
+                            rows = cursor.execute(f"SELECT * FROM {table} WHERE exam_id = ?", (exam_id,)).fetchall()
+                            result[table] = [dict(row) for row in rows]
+                    finally:
+                        cursor.execute("COMMIT")
             
             return result
             
         except Exception as e:
             return {"error": f"Error retrieving complete examination: {str(e)}"}
 
+    def _insert_rows(self, cursor: sqlite3.Cursor, table_name: str, rows: List[Dict[str, Any]]) -> None:
+        """Insert rows with one prepared executemany per distinct column set"""
+        columns_by_name = self._get_cached_schema(table_name)[2]
+        groups: Dict[tuple, List[tuple]] = {}
+        for row in rows:
+            columns, values = _bind_row(row, columns_by_name)
+            groups.setdefault(columns, []).append(values)
+        
+        for columns, values in groups.items():
+            cursor.executemany(_insert_sql(table_name, columns), values)
+
     def create_complete_examination(self, examination_data: Dict[str, Any]) -> Dict[str, Any]:
         """Create a complete examination with all related data"""
         try:
@@ -236,35 +441,56 @@ class NavmedDatabase:
             if 'examination' not in examination_data:
                 return {"success": False, "error": "Missing examination data"}
             
-            exam_result = self.add_examination_data('examinations', examination_data['examination'])
-            if not exam_result["success"]:
-                return {"success": False, "errors": exam_result.get("errors", [exam_result.get("error")])}
-            
-            exam_id = exam_result["inserted_id"]
-            created_records = {"examinations": 1}
-            
-            # Add related records with the exam_id
-            related_sections = [
-                'medical_history', 'laboratory_findings', 'urine_tests',
-                'additional_studies', 'physical_examination', 'abnormal_findings',
-                'assessments', 'certifications'
-            ]
+            exam_data = examination_data['examination']
+            validation = self.validate_exam_data('examinations', exam_data)
+            if not validation["valid"]:
+                return {"success": False, "errors": validation["errors"]}
             
-            for section in related_sections:
-                if section in examination_data and examination_data[section]:
-                    section_data = examination_data[section].copy()
-                    section_data['exam_id'] = exam_id
+            # The whole exam is one transaction, so it costs a single commit
+            with self.transaction() as conn:
+                with closing(conn.cursor()) as cursor:
+                    columns, values = _bind_row(exam_data, self._get_cached_schema('examinations')[2])
+                    cursor.execute(_insert_sql('examinations', columns), values)
+                    exam_id = cursor.lastrowid
+                    created_records = {"examinations": 1}
+                    failed_sections = {}
                     
-                    section_result = self.add_examination_data(section, section_data)
-                    if section_result["success"]:
-                        created_records[section] = 1
-                    else:
-                        logger.warning(f"Failed to create {section}: {section_result}")
+                    # Add related records with the exam_id; a section is one record or a list of them
+                    for section in RELATED_TABLES:
+                        section_rows = examination_data.get(section)
+                        if not section_rows:
+                            continue
+                        if isinstance(section_rows, dict):
+                            section_rows = [section_rows]
+                        
+                        section_rows = [{**row, 'exam_id': exam_id} for row in section_rows]
+                        valid_rows = []
+                        for row, errors in zip(section_rows, self.validate_many(section, section_rows)):
+                            if errors:
+                                logger.warning("Failed to create %s: %s", section, errors)
+                                failed_sections.setdefault(section, []).extend(errors)
+                            else:
+                                valid_rows.append(row)
+                        if not valid_rows:
+                            continue
+                        
+                        # A failed section is undone on its own without losing the rest of the exam
+                        cursor.execute("SAVEPOINT section")
+                        try:
+                            self._insert_rows(cursor, section, valid_rows)
+                        except sqlite3.Error as e:
+                            cursor.execute("ROLLBACK TO section")
+                            logger.warning("Failed to create %s: %s", section, e)
+                            failed_sections.setdefault(section, []).append(str(e))
+                        else:
+                            created_records[section] = len(valid_rows)
+                        cursor.execute("RELEASE section")
             
             return {
                 "success": True,
                 "exam_id": exam_id,
-                "created_records": created_records
+                "created_records": created_records,
+                "failed_sections": failed_sections
             }
             
         except Exception as e:
@@ -274,25 +500,10 @@ class NavmedDatabase:
         """Get a summary of examination(s) for reporting"""
         try:
             if exam_id:
-                base_query = """
-                    SELECT e.*, f.facility_name, a.initial_assessment, c.examination_complete_date
-                    FROM examinations e
-                    LEFT JOIN examining_facilities f ON e.facility_id = f.facility_id
-                    LEFT JOIN assessments a ON e.exam_id = a.exam_id
-                    LEFT JOIN certifications c ON e.exam_id = c.exam_id
-                    WHERE e.exam_id = ?
-                """
+                base_query = SUMMARY_BY_EXAM_SQL
                 params = (exam_id,)
             elif patient_ssn:
-                base_query = """
-                    SELECT e.*, f.facility_name, a.initial_assessment, c.examination_complete_date
-                    FROM examinations e
-                    LEFT JOIN examining_facilities f ON e.facility_id = f.facility_id
-                    LEFT JOIN assessments a ON e.exam_id = a.exam_id
-                    LEFT JOIN certifications c ON e.exam_id = c.exam_id
-                    WHERE e.patient_ssn = ?
-                    ORDER BY e.exam_date DESC
-                """
+                base_query = SUMMARY_BY_SSN_SQL
                 params = (patient_ssn,)
             else:
                 return {"error": "Must provide either exam_id or patient_ssn"}
@@ -1,84 +1,299 @@
 """
 PDF processing utilities for radiation medical exam documentation.
 """
+import asyncio
+import io
+import multiprocessing
 import os
+import re
+from bisect import bisect_right
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import aclosing
 from pypdf import PdfReader
-from typing import Dict, List
+from typing import AsyncIterator, Dict, FrozenSet, List, Optional, Tuple
+
+# Extracted documents kept in memory by default, least recently used evicted first
+DEFAULT_CACHE_MAX = 8
+
+# Matches the word that marks a chapter heading, in any case
+_CHAPTER_RE = re.compile("CHAPTER", re.IGNORECASE)
+
+
+def _extract_text_sync(full_path: str) -> str:
+    """Extract text from a PDF file (blocking; safe to run in a worker process)."""
+    reader = PdfReader(full_path)
+    # Pages are written straight into one buffer rather than kept as a list of strings
+    buf = io.StringIO()
+    separator = ""
+    
+    for page_num, page in enumerate(reader.pages):
+        page_text = page.extract_text()
+        if page_text.strip():  # Only add non-empty pages
+            buf.write(f"{separator}--- PAGE {page_num + 1} ---\n")
+            buf.write(page_text)
+            separator = "\n\n"
+    
+    return buf.getvalue()
 
 
 class PDFProcessor:
     """Handle PDF document processing and content extraction."""
     
-    def __init__(self, base_path: str):
+    def __init__(self, base_path: str, cache_max: int = DEFAULT_CACHE_MAX):
         self.base_path = base_path
-        self._cache: Dict[str, str] = {}
+        self.cache_max = cache_max
+        # Extracted text keyed by filename, stored with the file's mtime at extraction,
+        # in least-recently-used order and capped at cache_max documents
+        self._cache: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        # Search index per file: mtime, original lines, casefolded text and its newline offsets
+        self._search_cache: Dict[str, Tuple[float, List[str], str, List[int]]] = {}
+        # Per-file locks so concurrent requests for a cold PDF parse it only once
+        self._locks: Dict[str, asyncio.Lock] = {}
+        # Directory listing keyed by the directory's mtime_ns, with a set for membership checks
+        self._pdf_list_cache: Optional[Tuple[int, List[str], FrozenSet[str]]] = None
+    
+    def _get_mtime(self, pdf_path: str) -> float:
+        """Return the PDF's modification time, raising FileNotFoundError if it is missing."""
+        full_path = os.path.join(self.base_path, pdf_path)
+        try:
+            return os.stat(full_path).st_mtime
+        except OSError:
+            raise FileNotFoundError(f"PDF not found: {full_path}")
+    
+    def _get_cached_text(self, pdf_path: str, mtime: float) -> Optional[str]:
+        """Return the cached text if it was extracted at this mtime, marking it recently used."""
+        cached = self._cache.get(pdf_path)
+        if cached is None or cached[0] != mtime:
+            return None
+        self._cache.move_to_end(pdf_path)
+        return cached[1]
+    
+    def _store_text(self, pdf_path: str, mtime: float, text: str) -> None:
+        """Cache extracted text, evicting the least recently used documents beyond cache_max."""
+        self._cache[pdf_path] = (mtime, text)
+        self._cache.move_to_end(pdf_path)
+        while len(self._cache) > self.cache_max:
+            evicted, _ = self._cache.popitem(last=False)
+            # The search index is derived from the text, so it goes too
+            self._search_cache.pop(evicted, None)
     
     async def extract_text_from_pdf(self, pdf_path: str) -> str:
         """Extract text content from a PDF file."""
-        if pdf_path in self._cache:
-            return self._cache[pdf_path]
+        mtime = self._get_mtime(pdf_path)
+        cached_text = self._get_cached_text(pdf_path, mtime)
+        if cached_text is not None:
+            return cached_text
         
-        full_path = os.path.join(self.base_path, pdf_path)
-        if not os.path.exists(full_path):
-            raise FileNotFoundError(f"PDF not found: {full_path}")
+        async with self._locks.setdefault(pdf_path, asyncio.Lock()):
+            # Another request may have finished the parse while we waited
+            cached_text = self._get_cached_text(pdf_path, mtime)
+            if cached_text is not None:
+                return cached_text
+            
+            try:
+                # Extract text using pypdf in a worker thread so the event loop keeps serving
+                loop = asyncio.get_running_loop()
+                extracted_text = await loop.run_in_executor(
+                    None, _extract_text_sync, os.path.join(self.base_path, pdf_path)
+                )
+                
+                # Cache the result
+                self._store_text(pdf_path, mtime, extracted_text)
+                return extracted_text
+                
+            except Exception as e:
+                raise ValueError(f"Error processing PDF {pdf_path}: {str(e)}")
+    
+    async def _get_search_index(self, pdf_path: str) -> Tuple[List[str], str, List[int]]:
+        """Get the PDF's lines, casefolded text and newline offsets, built once per extraction."""
+        text = await self.extract_text_from_pdf(pdf_path)
+        mtime = self._cache[pdf_path][0]
+        
+        cached = self._search_cache.get(pdf_path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1], cached[2], cached[3]
+        
+        lines = text.split('\n')
+        folded = text.casefold()
+        # Offsets come from the casefolded text because casefold can change line lengths
+        newlines = []
+        pos = folded.find('\n')
+        while pos != -1:
+            newlines.append(pos)
+            pos = folded.find('\n', pos + 1)
+        
+        self._search_cache[pdf_path] = (mtime, lines, folded, newlines)
+        return lines, folded, newlines
+    
+    async def find_matching_lines(
+        self, pdf_path: str, needle: str, max_hits: Optional[int] = None
+    ) -> Tuple[List[str], List[int]]:
+        """
+        Get the PDF's lines and the indices of lines containing a casefolded needle.
+        Scans the casefolded text with str.find, maps hit offsets to line numbers and
+        stops after max_hits matching lines when given.
+        """
+        lines, folded, newlines = await self._get_search_index(pdf_path)
+        if not needle or '\n' in needle or (max_hits is not None and max_hits < 1):
+            return lines, []
+        
+        hits = []
+        pos = folded.find(needle)
+        while pos != -1:
+            line_no = bisect_right(newlines, pos)
+            hits.append(line_no)
+            if line_no == len(newlines) or len(hits) == max_hits:
+                break
+            # Resume at the start of the next line so each line is reported once
+            pos = folded.find(needle, newlines[line_no] + 1)
+        
+        return lines, hits
+    
+    async def preload_pdfs(self, pdf_files: Optional[List[str]] = None) -> None:
+        """Extract uncached PDFs in parallel worker processes and fill the text cache."""
+        if pdf_files is None:
+            pdf_files = self.get_available_pdfs()
+        
+        pending = []
+        for pdf in pdf_files:
+            try:
+                mtime = self._get_mtime(pdf)
+            except FileNotFoundError:
+                continue
+            cached = self._cache.get(pdf)
+            if cached is None or cached[0] != mtime:
+                pending.append((pdf, mtime))
+        if not pending:
+            return
         
+        loop = asyncio.get_running_loop()
+        # Workers are spawned, not forked: forking a process that already runs threads is unsafe
+        pool = ProcessPoolExecutor(
+            max_workers=min(len(pending), os.cpu_count() or 1),
+            mp_context=multiprocessing.get_context("spawn"),
+        )
         try:
-            # Extract text using pypdf
-            reader = PdfReader(full_path)
-            text_content = []
-            
-            for page_num, page in enumerate(reader.pages):
-                page_text = page.extract_text()
-                if page_text.strip():  # Only add non-empty pages
-                    text_content.append(f"--- PAGE {page_num + 1} ---\n{page_text}")
-            
-            extracted_text = "\n\n".join(text_content)
+            texts = await asyncio.gather(
+                *(loop.run_in_executor(pool, _extract_text_sync, os.path.join(self.base_path, pdf))
+                  for pdf, _ in pending),
+                return_exceptions=True,
+            )
+        finally:
+            # Don't block the event loop waiting on workers, e.g. when the preload is cancelled
+            pool.shutdown(wait=False, cancel_futures=True)
+        
+        for (pdf, mtime), text in zip(pending, texts):
+            # Failures are left uncached so the regular path reports them on demand
+            if isinstance(text, str):
+                self._store_text(pdf, mtime, text)
+    
+    async def extract_text_stream(self, pdf_path: str) -> AsyncIterator[str]:
+        """
+        Yield the PDF's text in chunks whose concatenation equals extract_text_from_pdf().
+        A cached document is yielded whole; otherwise pages are parsed and yielded one at a
+        time, and a stream read to the end fills the text cache.
+        """
+        mtime = self._get_mtime(pdf_path)
+        cached_text = self._get_cached_text(pdf_path, mtime)
+        if cached_text is not None:
+            yield cached_text
+            return
+        
+        # Shares extract_text_from_pdf's per-file lock, so a cold PDF is parsed by one reader at a time
+        async with self._locks.setdefault(pdf_path, asyncio.Lock()):
+            # Another request may have finished the parse while we waited
+            cached_text = self._get_cached_text(pdf_path, mtime)
+            if cached_text is not None:
+                yield cached_text
+                return
             
-            # Cache the result
-            self._cache[pdf_path] = extracted_text
-            return extracted_text
+            loop = asyncio.get_running_loop()
+            buf = io.StringIO()
+            try:
+                reader = await loop.run_in_executor(None, PdfReader, os.path.join(self.base_path, pdf_path))
+                separator = ""
+                for page_num, page in enumerate(reader.pages):
+                    page_text = await loop.run_in_executor(None, page.extract_text)
+                    if page_text.strip():  # Only yield non-empty pages
+                        chunk = f"{separator}--- PAGE {page_num + 1} ---\n{page_text}"
+                        buf.write(chunk)
+                        yield chunk
+                        separator = "\n\n"
+            except Exception as e:
+                raise ValueError(f"Error processing PDF {pdf_path}: {str(e)}")
             
-        except Exception as e:
-            raise ValueError(f"Error processing PDF {pdf_path}: {str(e)}")
+            # Only a complete parse is cached; a consumer that stops early leaves nothing behind
+            self._store_text(pdf_path, mtime, buf.getvalue())
+    
+    async def _iter_lines(self, pdf_path: str) -> AsyncIterator[str]:
+        """Yield the PDF's text line by line without holding the whole document's lines."""
+        partial = ""
+        async with aclosing(self.extract_text_stream(pdf_path)) as chunks:
+            async for chunk in chunks:
+                lines = (partial + chunk).split('\n')
+                partial = lines.pop()
+                for line in lines:
+                    yield line
+        yield partial
     
     async def extract_chapter(self, pdf_path: str, chapter_num: int) -> str:
         """Extract a specific chapter from the PDF."""
-        full_text = await self.extract_text_from_pdf(pdf_path)
-        
         # Simple chapter extraction - look for chapter markers
-        lines = full_text.split('\n')
         chapter_lines = []
         in_chapter = False
+        # Case-insensitive patterns built once per call instead of upper-casing every line
+        chapter_start = re.compile(
+            f"{re.escape(f'CHAPTER {chapter_num}')}|{re.escape(f'CH-{chapter_num}')}", re.IGNORECASE
+        )
+        next_chapter = str(chapter_num + 1)
         
-        for line in lines:
-            line_upper = line.strip().upper()
-            
-            # Start of target chapter
-            if f"CHAPTER {chapter_num}" in line_upper or f"CH-{chapter_num}" in line_upper:
-                in_chapter = True
-                chapter_lines.append(line)
-                continue
-            
-            # End of chapter (next chapter starts)
-            if in_chapter and ("CHAPTER" in line_upper and str(chapter_num + 1) in line_upper):
-                break
-            
-            if in_chapter:
-                chapter_lines.append(line)
+        async with aclosing(self._iter_lines(pdf_path)) as lines:
+            async for line in lines:
+                # Start of target chapter
+                if chapter_start.search(line):
+                    in_chapter = True
+                    chapter_lines.append(line)
+                    continue
+                
+                # End of chapter (next chapter starts); stop reading further pages
+                if in_chapter and next_chapter in line and _CHAPTER_RE.search(line):
+                    break
+                
+                if in_chapter:
+                    chapter_lines.append(line)
         
         if not chapter_lines:
             return f"Chapter {chapter_num} not found in PDF"
         
         return "\n".join(chapter_lines)
     
-    def get_available_pdfs(self) -> List[str]:
-        """Get list of available PDF files."""
-        if not os.path.exists(self.base_path):
-            return []
+    def _get_pdf_listing(self) -> Tuple[List[str], FrozenSet[str]]:
+        """Get the available PDF filenames as a list and a frozenset, rescanning only on change."""
+        try:
+            dir_mtime = os.stat(self.base_path).st_mtime_ns
+        except OSError:
+            return [], frozenset()
         
-        pdf_files = []
-        for file in os.listdir(self.base_path):
-            if file.lower().endswith('.pdf'):
-                pdf_files.append(file)
+        # Directory mtime changes whenever a file is added, removed or renamed
+        if self._pdf_list_cache is not None and self._pdf_list_cache[0] == dir_mtime:
+            return self._pdf_list_cache[1], self._pdf_list_cache[2]
         
-        return pdf_files
+        # scandir's entries carry their file type, so directories are skipped without a stat each
+        with os.scandir(self.base_path) as entries:
+            pdf_files = [
+                entry.name for entry in entries
+                if entry.name.lower().endswith('.pdf') and entry.is_file()
+            ]
+        
+        pdf_set = frozenset(pdf_files)
+        self._pdf_list_cache = (dir_mtime, pdf_files, pdf_set)
+        return pdf_files, pdf_set
+    
+    def get_available_pdfs(self) -> List[str]:
+        """Get list of available PDF files."""
+        return self._get_pdf_listing()[0]
+    
+    def has_pdf(self, pdf_path: str) -> bool:
+        """Check whether a PDF file is available."""
+        return pdf_path in self._get_pdf_listing()[1]